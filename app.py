@@ -1,11 +1,30 @@
 import os
 import json
 import logging
-from flask import Flask, jsonify
-from utils.scraper import scrape_team_stats, get_player_data, needs_update, write_json, calculate_opponent_stats
+from flask import Flask, jsonify, Response, request
+from utils.scraper import scrape_team_stats, get_player_data, get_player_form, needs_update, write_json, read_json_cached, public_team_data
+from utils.refresh import refresh_teams
+from utils.opponent_index import opponent_index, OpponentSnapshot
+from utils import storage_sqlite
+from utils.opponent_stats import build_opponent_stats
+from utils.jobs import RefreshScheduler
+from utils.json_provider import FastJSONProvider
+from utils.http_validators import cache_validated, data_version
+from utils.game_query import GameQuery, GameQueryIndex, QueryIndexCache, query_indexes, team_query_index, team_query_response
+from utils.hit_rates import HitRateIndex, parse_lines, parse_stats
+from utils.matchup import build_matchup, allowed_per_game, DEFAULT_LAST_N
+from utils.defense import defensive_profiles, DEFENSE_FILE
+from utils.columnar import ColumnStore, COLUMNAR_FILE
+from utils.doc_cache import DocumentCache
+from utils.storage_json import write_json_file
+from utils.form import form_metrics
+from utils.compression import compress_response, encoded_response
 
 from flask_cors import CORS
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+# Compresión gzip/brotli de las respuestas JSON grandes
+app.after_request(compress_response)
 # Configura CORS permitiendo solo el origen necesario
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
 
@@ -73,22 +92,76 @@ file_handler.setFormatter(JSONFormatter())
 logger.addHandler(file_handler)
 
 
+def data_paths(*file_names):
+    """Archivos de los que dependen las respuestas (para ETag y Last-Modified)."""
+    if storage_sqlite.enabled():
+        return [storage_sqlite.SQLITE_PATH, f"{storage_sqlite.SQLITE_PATH}-wal"]
+    return [os.path.join(DATA_DIR, file_name) for file_name in file_names]
+
+
+def team_paths(team_name, **kwargs):
+    return data_paths(f"{team_name}.json")
+
+
+def opponent_paths(**kwargs):
+    return data_paths(os.path.basename(OUTPUT_FILE)) + [DEFENSE_FILE]
+
+
+def teams_list_paths(**kwargs):
+    return [os.path.join(os.path.dirname(__file__), "equipos.json")]
+
+
 @app.route("/api/team/<team_name>", methods=["GET"])
+@cache_validated(team_paths, fresh_only=True)
 def get_team_data(team_name):
+    try:
+        query = GameQuery.from_args(request.args) if GameQuery.requested(request.args) else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         logger.info(f"Fetching data for team: {team_name}")
         team_data = scrape_team_stats(team_name)
-        return jsonify(team_data)
+        if query is None:
+            return jsonify(public_team_data(team_data))
+
+        index = query_indexes.get(
+            ("team", team_name), data_version(team_paths(team_name)), lambda version: team_query_index(team_data, version)
+        )
+        try:
+            return jsonify(team_query_response(index, team_data, query))
+        except ValueError as e:
+            # Cursor de otra versión de los datos
+            return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching data for team {team_name}: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/team/<team_name>/<player_name>", methods=["GET"])
+@cache_validated(team_paths)
 def api_get_player_data(team_name, player_name):
+    try:
+        query = GameQuery.from_args(request.args) if GameQuery.requested(request.args) else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         logger.info(f"Fetching data for player {player_name} in team {team_name}")
+        if request.args.get("view") == "form":
+            # Medias y medianas móviles y EWMA de cada estadística
+            return jsonify(form_metrics(get_player_form(team_name, player_name)))
+
         player_data = get_player_data(team_name, player_name)
-        return jsonify(player_data)
+        if query is None:
+            return jsonify(player_data)
+
+        index = query_indexes.get(
+            ("player", team_name, player_name), data_version(team_paths(team_name)),
+            lambda version: GameQueryIndex(player_data, version=version),
+        )
+        try:
+            games, total, next_cursor = index.page(query)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"games": games, "count": total, "next_cursor": next_cursor})
     except FileNotFoundError as e:
         logger.warning(f"File not found for team {team_name}: {str(e)}")
         return jsonify({"error": f"Archivo no encontrado: {str(e)}"}), 404
@@ -100,16 +173,23 @@ def api_get_player_data(team_name, player_name):
         return jsonify({"error": f"Error interno: {str(e)}"}), 500
 
 @app.route("/api/players/<team_name>/", methods=["GET"])
+@cache_validated(team_paths)
 def api_get_player_list(team_name):
     try:
         logger.info(f"Fetching player list for team: {team_name}")
+        if storage_sqlite.enabled():
+            player_names = storage_sqlite.get_player_names(team_name)
+            if player_names is None:
+                logger.warning(f"Team not found in database: {team_name}")
+                return jsonify({"error": f"El archivo para el equipo {team_name} no existe."}), 404
+            return jsonify(player_names)
+
         file_path = os.path.join(DATA_DIR, f"{team_name}.json")
         if not os.path.exists(file_path):
             logger.warning(f"File does not exist for team: {team_name}")
             return jsonify({"error": f"El archivo para el equipo {team_name} no existe."}), 404
 
-        with open(file_path, "r") as file:
-            team_data = json.load(file)
+        team_data = read_json_cached(file_path)
 
         player_names = list(team_data.get("players", {}).keys())
         return jsonify(player_names)
@@ -117,7 +197,154 @@ def api_get_player_list(team_name):
         logger.error(f"Internal error while fetching player list for team {team_name}: {str(e)}")
         return jsonify({"error": f"Error interno: {str(e)}"}), 500
 
+def load_stored_team(team_name):
+    """Documento guardado de un equipo sin lanzar scraping, o None si no existe."""
+    if storage_sqlite.enabled():
+        return storage_sqlite.load_team_cached(team_name)
+    file_path = os.path.join(DATA_DIR, f"{team_name}.json")
+    if not os.path.exists(file_path):
+        return None
+    return read_json_cached(file_path)
+
+
+def stored_columns(team_name):
+    """
+    (plantilla, columnas) del equipo desde el almacén columnar (data/games.npz), o None
+    si no existe o el JSON del equipo ha cambiado desde el último refresco completo.
+    """
+    if storage_sqlite.enabled():
+        return None
+    try:
+        store = query_indexes.get("columnar", DocumentCache.version(COLUMNAR_FILE), lambda version: ColumnStore.load())
+        return store.team(team_name, DocumentCache.version(os.path.join(DATA_DIR, f"{team_name}.json")))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"No se pudo leer {COLUMNAR_FILE}: {e}")
+        return None
+
+
+def hit_rate_index(team_name):
+    """Índice de aciertos del equipo por versión de sus datos. Lanza FileNotFoundError si no hay datos."""
+    def build(version):
+        stored = stored_columns(team_name)
+        if stored is not None:
+            return HitRateIndex.from_columns(*stored, team_name, version)
+        team_data = load_stored_team(team_name)
+        if not team_data:
+            raise FileNotFoundError(f"El archivo para el equipo {team_name} no existe.")
+        return HitRateIndex.from_team_data(team_data, version)
+
+    return query_indexes.get(("hit_rates", team_name), data_version(team_paths(team_name)), build)
+
+
+@app.route("/api/hit_rates/<team_name>", methods=["GET"])
+@cache_validated(team_paths)
+def api_get_hit_rates(team_name):
+    """
+    Porcentaje de partidos en que los jugadores superan una o varias líneas.
+    Parámetros: stat (una o varias, separadas por comas), lines, player (por defecto
+    toda la plantilla) y los filtros opponent, home_or_away, from, to y last_n.
+    """
+    try:
+        stats = parse_stats(request.args.get("stat"))
+        lines = parse_lines(request.args.get("lines", ""))
+        query = GameQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        try:
+            index = hit_rate_index(team_name)
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        players = index.roster
+        if "player" in query.filters:
+            players = [name for name in players if name == query.filters["player"]]
+            if not players:
+                return jsonify({"error": f"Jugador no encontrado: {query.filters['player']}"}), 404
+
+        return jsonify({
+            "team_name": team_name,
+            "players": index.evaluate_roster(players, stats, lines, query.without("player")),
+        })
+    except Exception as e:
+        logger.error(f"Internal error while computing hit rates for team {team_name}: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
+
+# Resultados de /api/matchup por pareja de equipos y versión de los datos
+matchup_cache = QueryIndexCache()
+
+
+def matchup_paths(local_team, visitor_team, **kwargs):
+    paths = team_paths(local_team) + team_paths(visitor_team) + opponent_paths()
+    return list(dict.fromkeys(paths))
+
+
+def opponent_snapshot():
+    """
+    Líneas por oponente con sus respuestas ya serializadas y precomprimidas: del archivo
+    consolidado o, con SQLite, de una sola consulta reutilizada mientras la base de
+    datos no cambie. Lanza FileNotFoundError si no hay archivo consolidado.
+    """
+    if storage_sqlite.enabled():
+        return storage_sqlite.cached(
+            "opponent_snapshot", lambda: OpponentSnapshot(None, storage_sqlite.get_all_opponent_lines())
+        )
+    return opponent_index.snapshot()
+
+
+def allowed_lines(team_name):
+    """Líneas de los rivales contra `team_name` (vacío si aún no hay estadísticas de oponentes)."""
+    try:
+        return opponent_snapshot().by_opponent.get(team_name) or []
+    except FileNotFoundError:
+        return []
+
+
+def defensive_profile(team_name):
+    """Perfil defensivo precalculado de un equipo, o None si aún no se ha generado."""
+    if not os.path.exists(DEFENSE_FILE):
+        return None
+    return read_json_cached(DEFENSE_FILE).get(team_name)
+
+
+def matchup_side(team_name):
+    team_data = load_stored_team(team_name)
+    if not team_data:
+        raise FileNotFoundError(f"El archivo para el equipo {team_name} no existe.")
+    index = hit_rate_index(team_name)
+    allowed = defensive_profile(team_name) or allowed_per_game(allowed_lines(team_name))
+    return team_data, index, allowed
+
+
+@app.route("/api/matchup/<local_team>/<visitor_team>", methods=["GET"])
+@cache_validated(matchup_paths)
+def api_get_matchup(local_team, visitor_team):
+    """
+    Enfrentamiento entre dos equipos en una sola respuesta: medias de temporada, forma
+    reciente de cada jugador (?last_n=, por defecto 5) y lo que permite cada defensa.
+    """
+    try:
+        last_n = GameQuery.from_args(request.args).last_n or DEFAULT_LAST_N
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        version = data_version(matchup_paths(local_team, visitor_team))
+        result = matchup_cache.get(
+            (local_team, visitor_team, last_n), version,
+            lambda version: build_matchup(matchup_side(local_team), matchup_side(visitor_team), last_n),
+        )
+        return jsonify(result)
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        logger.error(f"Internal error while building matchup {local_team} vs {visitor_team}: {str(e)}")
+        return jsonify({"error": f"Error interno: {str(e)}"}), 500
+
+
 @app.route("/api/teams", methods=["GET"])
+@cache_validated(teams_list_paths)
 def api_get_teams():
     try:
         logger.info("Fetching list of all teams")
@@ -145,152 +372,153 @@ from datetime import datetime
 
 
 
-@app.route("/api/update_teams", methods=["GET"])
-def update_teams():
+def run_update(job):
     """
-    Actualiza los datos de todos los equipos y luego procesa el archivo consolidado con
-    estadísticas permitidas por oponente.
+    Refresco completo (se ejecuta en segundo plano): scraping de todos los equipos y
+    cálculo del archivo consolidado con estadísticas permitidas por oponente.
     """
-    # Rutas de los archivos
-    date_ids_path = "date_ids.json"  # Ruta al archivo de IDs de fecha
-    output_path = "opponent_stats_updated.json"  # Ruta para guardar el archivo actualizado
+    logger.info(f"Iniciando actualización de datos de todos los equipos (trabajo {job.id})...")
 
-    try:
-        logger.info("Iniciando actualización de datos de todos los equipos...")
+    # Scraping concurrente de todos los equipos; los errores quedan aislados por equipo
+    job.set_stage("scraping")
+    refresh_result = refresh_teams(list(equipos.keys()), on_team_done=job.team_done)
+    for team_name, error in refresh_result["errors"].items():
+        logger.error(f"Error al actualizar el equipo {team_name}: {error}")
 
+    logger.info("Todos los equipos actualizados. Iniciando cálculo de estadísticas consolidadas...")
 
-        for team_name in equipos.keys():
-            try:
-                logger.info(f"Procesando estadísticas para el equipo: {team_name}")
-                scrape_team_stats(team_name)
-            except Exception as e:
-                logger.error(f"Error al actualizar el equipo {team_name}: {str(e)}")
+    # Una sola pasada sobre los equipos genera opponent_stats.json, opponent_stats_updated.json
+    # y las columnas de todos los partidos para los cálculos vectorizados
+    job.set_stage("aggregating")
+    aggregates = build_opponent_stats(DATA_DIR, list(equipos.keys()))
 
-        logger.info("Todos los equipos actualizados. Iniciando cálculo de estadísticas consolidadas...")
+    # Almacén columnar (.npz) del que leen los índices de aciertos y /api/matchup
+    ColumnStore(aggregates.columns, aggregates.sources, aggregates.rosters).save()
 
-        # Llamar a la función calculate_opponent_stats
-        calculate_opponent_stats()
+    # Publicar el nuevo índice en memoria
+    if os.path.exists(OUTPUT_FILE):
+        opponent_index.reload()
 
-        # Definir la ruta del archivo de salida
-        consolidated_file = os.path.join(DATA_DIR, "opponent_stats.json")
+    # Perfiles defensivos (permitido por partido, últimos 5/10, casa/fuera)
+    write_json_file(defensive_profiles(aggregates.columns), DEFENSE_FILE)
 
-        if os.path.exists(consolidated_file):
-            logger.info(f"Estadísticas consolidadas guardadas en {consolidated_file}")
-            
-            process_opponent_stats(consolidated_file, date_ids_path, output_path)
-
-            return jsonify({
-                "status": "success",
-                "message": "Estadísticas de oponentes calculadas y guardadas correctamente.",
-                "file": consolidated_file
-            }), 200
-        else:
-            logger.error("El archivo consolidado no se encontró después de calcular las estadísticas.")
-            return jsonify({
-                "status": "error",
-                "message": "El archivo consolidado no se generó correctamente."
-            }), 500
+    if not os.path.exists(OUTPUT_FILE):
+        raise RuntimeError("El archivo consolidado no se generó correctamente.")
+    logger.info(f"Estadísticas consolidadas guardadas en {OUTPUT_FILE}")
+
+
+refresh_scheduler = RefreshScheduler(run_update, teams_total=len(equipos))
 
+
+@app.route("/api/update_teams", methods=["GET", "POST"])
+def update_teams():
+    """
+    Lanza en segundo plano la actualización de todos los equipos y devuelve el id del
+    trabajo. Si ya hay una actualización en curso, devuelve la existente.
+    """
+    try:
+        job, created = refresh_scheduler.submit()
+        if created:
+            logger.info(f"Actualización encolada: {job.id}")
+        return jsonify({
+            "status": "accepted",
+            "message": "Actualización iniciada." if created else "Ya hay una actualización en curso.",
+            "job_id": job.id,
+            "status_url": f"/api/update_teams/{job.id}",
+        }), 202
     except Exception as e:
-        logger.error(f"Error al procesar estadísticas de oponentes: {str(e)}")
+        logger.error(f"Error al iniciar la actualización: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/api/update_teams/status", methods=["GET"])
+def update_teams_status():
+    """
+    Estado del último trabajo de actualización.
+    """
+    job = refresh_scheduler.latest()
+    if job is None:
+        return jsonify({"error": "No se ha lanzado ninguna actualización."}), 404
+    return jsonify(job.as_dict()), 200
+
+
+@app.route("/api/update_teams/<job_id>", methods=["GET"])
+def update_teams_job(job_id):
+    """
+    Estado y progreso de un trabajo de actualización: equipos terminados, páginas
+    descargadas, errores y tiempo estimado restante.
+    """
+    job = refresh_scheduler.get(job_id)
+    if job is None:
+        return jsonify({"error": f"No existe el trabajo {job_id}"}), 404
+    return jsonify(job.as_dict()), 200
+
+
 
 OUTPUT_FILE = os.path.join(DATA_DIR, "opponent_stats.json")
 @app.route("/api/opponent_stats/<team_name>", methods=["GET"])
+@cache_validated(opponent_paths)
 def get_team_opponent_stats(team_name):
     """
     Devuelve las estadísticas permitidas por oponente para un equipo específico.
+    Admite los parámetros de consulta de GameQuery (p. ej. ?team=...&last_n=10&fields=PTS)
+    y ?view=profile para el perfil defensivo precalculado.
     """
+    if request.args.get("view") == "profile":
+        profile = defensive_profile(team_name)
+        if profile is None:
+            return jsonify({"error": f"No hay perfil defensivo para {team_name}"}), 404
+        return jsonify(profile), 200
+
+    try:
+        query = GameQuery.from_args(request.args) if GameQuery.requested(request.args) else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
-        with open(OUTPUT_FILE, "r") as file:
-            opponent_stats = json.load(file)
+        if query is not None:
+            return opponent_query_response(team_name, query)
 
-        team_stats = opponent_stats.get(team_name)
-        if not team_stats:
+        snapshot = opponent_snapshot()
+        if not snapshot.by_opponent.get(team_name):
             return jsonify({"error": f"No se encontraron estadísticas para {team_name}"}), 404
 
-        return jsonify(team_stats), 200
+        response = Response(snapshot.team_body(team_name), status=200, mimetype="application/json")
+        return encoded_response(response, snapshot.team_encoded(team_name))
     except FileNotFoundError:
         return jsonify({"error": "No se encontraron estadísticas de oponentes calculadas."}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def opponent_query_response(team_name, query):
+    """Líneas permitidas por `team_name` filtradas y paginadas desde su índice."""
+    lines = opponent_snapshot().by_opponent.get(team_name)
+    if not lines:
+        return jsonify({"error": f"No se encontraron estadísticas para {team_name}"}), 404
+
+    index = query_indexes.get(("opponent", team_name), data_version(opponent_paths()), lambda version: GameQueryIndex(lines, version=version))
+    try:
+        games, total, next_cursor = index.page(query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"games": games, "count": total, "next_cursor": next_cursor}), 200
+
+
 @app.route("/api/opponent_stats", methods=["GET"])
+@cache_validated(opponent_paths)
 def get_opponent_stats():
     """
     Devuelve las estadísticas permitidas por oponente.
     """
     try:
-        with open(OUTPUT_FILE, "r") as file:
-            opponent_stats = json.load(file)
-        return jsonify(opponent_stats), 200
+        snapshot = opponent_snapshot()
+        response = Response(snapshot.bulk_body, status=200, mimetype="application/json")
+        return encoded_response(response, snapshot.bulk_encoded)
     except FileNotFoundError:
         return jsonify({"error": "No se encontraron estadísticas de oponentes calculadas."}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-import json
-from collections import defaultdict
-
-def process_opponent_stats(opponent_stats_path, date_ids_path, output_path):
-    """
-    Actualiza opponent_stats.json con date_id y calcula estadísticas (total y average),
-    generando una estructura de salida más completa.
-    """
-    # Cargar los datos
-    with open(opponent_stats_path, "r", encoding="utf-8") as file:
-        opponent_stats = json.load(file)
-
-    with open(date_ids_path, "r", encoding="utf-8") as file:
-        date_ids = json.load(file)
-
-    # Crear estructura para el archivo actualizado
-    updated_stats = {}
-
-    # Procesar cada equipo y calcular estadísticas
-    for team, games in opponent_stats.items():
-        games_with_date_id = []
-        team_totals = defaultdict(float)
-        unique_date_ids = set()
-
-        for game in games:
-            # Obtener el date_id correspondiente
-            game_date = game.get("date")
-            date_id = date_ids.get(game_date)
-            if not date_id:
-                print(f"Fecha {game_date} no encontrada en date_ids.json. Saltando entrada.")
-                continue
-
-            # Añadir el date_id al juego
-            game["date_id"] = date_id
-            games_with_date_id.append(game)
-
-            # Acumular estadísticas del equipo
-            unique_date_ids.add(date_id)  # Contar partidos únicos
-            for stat, value in game.items():
-                if isinstance(value, (int, float)):  # Solo sumar estadísticas numéricas
-                    team_totals[stat] += value
-
-        # Calcular promedios
-        num_games = len(unique_date_ids)
-        team_averages = {stat: total / num_games for stat, total in team_totals.items()} if num_games > 0 else {}
-
-        # Actualizar la estructura del equipo
-        updated_stats[team] = {
-            "games": games_with_date_id,
-            "total": dict(team_totals),
-            "average": team_averages
-        }
-
-    # Guardar el archivo actualizado
-    with open(output_path, "w", encoding="utf-8") as file:
-        json.dump(updated_stats, file, indent=4, ensure_ascii=False)
-
-    print(f"Archivo actualizado guardado en {output_path}.")
-
 
 
 if __name__ == "__main__":
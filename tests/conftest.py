@@ -0,0 +1,43 @@
+import json
+import random
+
+import pytest
+
+from utils.dates import format_date
+
+SEASON_TEAMS = ["Boston Celtics", "Miami Heat", "Utah Jazz", "Denver Nuggets", "Chicago Bulls"]
+
+
+def make_team_document(team_name, rng, n_players=4, n_games=12):
+    players = {}
+    for p in range(n_players):
+        games = []
+        for g in range(n_games):
+            pts, reb, ast = rng.randint(0, 35), rng.randint(0, 14), rng.randint(0, 11)
+            games.append({
+                "date": format_date(1800 + 3 * g) if (p, g) != (1, 4) else "fecha rara",
+                "opponent": rng.choice([team for team in SEASON_TEAMS if team != team_name]),
+                "home_or_away": rng.choice(["home", "away"]),
+                "PTS": pts, "REB": reb, "AST": ast, "MIN": float(rng.randint(5, 40)),
+                "2M": float(rng.randint(0, 9)), "2A": float(rng.randint(9, 15)),
+                "3M": float(rng.randint(0, 5)), "3A": float(rng.randint(5, 9)),
+                "STL": rng.randint(0, 3), "BLK": rng.randint(0, 2), "TO": rng.randint(0, 5),
+                "PTS+AST": pts + ast, "REB+AST": reb + ast, "PTS+REB": pts + reb, "PTS+REB+AST": pts + reb + ast,
+            })
+        players[f"{team_name} {p}"] = games
+    return {"team_name": team_name, "players": players, "global_stats": {}}
+
+
+@pytest.fixture
+def season_data(tmp_path):
+    """
+    Temporada generada: (carpeta con los JSON de equipo, lista de equipos). El orden de
+    la lista no es el alfabético de los archivos.
+    """
+    rng = random.Random(11)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for team_name in SEASON_TEAMS:
+        with open(data_dir / f"{team_name}.json", "w", encoding="utf-8") as file:
+            json.dump(make_team_document(team_name, rng), file)
+    return data_dir, list(SEASON_TEAMS)
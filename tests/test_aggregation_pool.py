@@ -0,0 +1,56 @@
+"""
+La agregación en el pool de procesos produce los mismos bytes que la secuencial, y si
+el pool se rompe se repite en serie con el mismo resultado.
+"""
+import json
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import aggregation_pool
+from utils.defense import defensive_profiles
+from utils.opponent_stats import build_opponent_stats
+
+
+def build_outputs(season_data, out_dir, workers):
+    data_dir, team_names = season_data
+    out_dir.mkdir()
+    output, updated = out_dir / "opponent_stats.json", out_dir / "opponent_stats_updated.json"
+    aggregates = build_opponent_stats(str(data_dir), team_names, str(output), str(updated), workers=workers)
+    profiles = json.dumps(defensive_profiles(aggregates.columns), sort_keys=True)
+    return output.read_bytes(), updated.read_bytes(), profiles
+
+
+def test_parallel_output_is_byte_identical(season_data, tmp_path, monkeypatch):
+    monkeypatch.setattr(aggregation_pool, "_pool_broken", False)
+    serial = build_outputs(season_data, tmp_path / "serial", workers=1)
+    parallel = build_outputs(season_data, tmp_path / "parallel", workers=2)
+    assert not aggregation_pool._pool_broken
+    assert parallel == serial
+
+
+class BrokenExecutor:
+    def __init__(self):
+        self.shutdown_calls = []
+
+    def map(self, func, items):
+        raise BrokenProcessPool("proceso terminado")
+
+    def shutdown(self, **kwargs):
+        self.shutdown_calls.append(kwargs)
+
+
+def test_broken_pool_falls_back_to_serial(season_data, tmp_path, monkeypatch):
+    broken = BrokenExecutor()
+    monkeypatch.setattr(aggregation_pool, "_pool_broken", False)
+    monkeypatch.setattr(aggregation_pool, "_executor", broken)
+    monkeypatch.setattr(aggregation_pool, "_executor_workers", 2)
+
+    serial = build_outputs(season_data, tmp_path / "serial", workers=1)
+    fallback = build_outputs(season_data, tmp_path / "fallback", workers=2)
+
+    assert fallback == serial
+    assert broken.shutdown_calls == [{"wait": False, "cancel_futures": True}]
+    assert aggregation_pool._pool_broken and aggregation_pool._executor is None
+
+    # Las llamadas siguientes ya no intentan usar procesos
+    monkeypatch.setattr(aggregation_pool, "_get_executor", lambda workers: BrokenExecutor().map(None, []))
+    assert aggregation_pool.map_ordered(abs, [-1, -2, 3], workers=2) == [1, 2, 3]
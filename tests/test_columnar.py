@@ -0,0 +1,80 @@
+"""
+El almacén columnar (.npz) se guarda y se recarga sin pérdidas, solo sirve equipos cuyo
+JSON no ha cambiado desde el refresco y los índices de aciertos construidos desde él
+dan los mismos resultados que los construidos desde el documento del equipo.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from utils.columnar import ColumnStore, GameColumns
+from utils.doc_cache import DocumentCache
+from utils.game_query import GameQuery
+from utils.hit_rates import HitRateIndex
+from utils.opponent_stats import build_opponent_stats
+
+
+@pytest.fixture
+def stored(season_data, tmp_path):
+    data_dir, team_names = season_data
+    aggregates = build_opponent_stats(
+        str(data_dir), team_names, str(tmp_path / "opponent_stats.json"), str(tmp_path / "updated.json"), workers=1
+    )
+    path = str(tmp_path / "games.npz")
+    ColumnStore(aggregates.columns, aggregates.sources, aggregates.rosters).save(path)
+    return data_dir, team_names, aggregates, ColumnStore.load(path)
+
+
+def team_version(data_dir, team_name):
+    return DocumentCache.version(os.path.join(data_dir, f"{team_name}.json"))
+
+
+def test_store_round_trip(stored):
+    _, team_names, aggregates, store = stored
+    assert store.columns.teams == aggregates.columns.teams
+    assert store.columns.players == aggregates.columns.players
+    for field in GameColumns.FIELDS:
+        np.testing.assert_array_equal(getattr(store.columns, field), getattr(aggregates.columns, field))
+    assert list(store.sources) == team_names
+    assert store.sources == aggregates.sources
+    assert store.rosters == aggregates.rosters
+
+
+def test_team_is_served_only_while_its_file_is_unchanged(stored):
+    data_dir, team_names, _, store = stored
+    team_name = team_names[0]
+    assert store.team(team_name, team_version(data_dir, team_name)) is not None
+    assert store.team("Atlanta Hawks", (0, 0)) is None
+
+    path = os.path.join(data_dir, f"{team_name}.json")
+    with open(path, encoding="utf-8") as file:
+        team_data = json.load(file)
+    team_data["players"]["Nuevo"] = []
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(team_data, file)
+    assert store.team(team_name, team_version(data_dir, team_name)) is None
+
+
+@pytest.mark.parametrize("args", [
+    {},
+    {"last_n": "5"},
+    {"opponent": "Miami Heat"},
+    {"home_or_away": "away", "last_n": "3"},
+    {"from": "2024-01-01"},
+    {"from": "1 ene 2018", "to": "2024-06-30", "opponent": "Utah Jazz"},
+])
+def test_hit_rates_from_store_match_team_document(stored, args):
+    data_dir, team_names, _, store = stored
+    lines = np.array([5.5, 12.5, 20.5])
+    for team_name in team_names:
+        with open(os.path.join(data_dir, f"{team_name}.json"), encoding="utf-8") as file:
+            team_data = json.load(file)
+        from_document = HitRateIndex.from_team_data(team_data)
+        from_store = HitRateIndex.from_columns(*store.team(team_name, team_version(data_dir, team_name)), team_name)
+
+        query = GameQuery.from_args(args)
+        assert from_store.roster == from_document.roster
+        assert (from_store.evaluate_roster(from_store.roster, ["PTS", "REB+AST"], lines, query)
+                == from_document.evaluate_roster(from_document.roster, ["PTS", "REB+AST"], lines, query))
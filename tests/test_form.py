@@ -0,0 +1,85 @@
+"""
+El estado de forma actualizado partido a partido coincide con el calculado de una vez.
+"""
+import random
+
+from utils.dates import format_date
+from utils.form import FORM_WINDOWS, form_metrics, update_player_form
+
+
+def make_games(n_games, seed=1):
+    rng = random.Random(seed)
+    games = []
+    for i in range(n_games):
+        pts, reb = rng.randint(0, 40), rng.randint(0, 15)
+        games.append({
+            "date": format_date(1900 + 2 * i),
+            "PTS": pts,
+            "REB": reb,
+            "PTS+REB": pts + reb,
+            "MIN": float(rng.randint(10, 40)),
+        })
+    return games
+
+
+def apply_one_by_one(games):
+    state = None
+    for game in games:
+        state = update_player_form(state, [game])
+    return state
+
+
+def assert_same_metrics(state, expected):
+    actual, wanted = form_metrics(state), form_metrics(expected)
+    assert actual["latest_date"] == wanted["latest_date"]
+    assert actual["games"] == wanted["games"]
+    assert actual["stats"].keys() == wanted["stats"].keys()
+    for key, metrics in wanted["stats"].items():
+        assert actual["stats"][key].keys() == metrics.keys()
+        for name, value in metrics.items():
+            assert abs(actual["stats"][key][name] - value) < 1e-9, (key, name)
+
+
+def test_incremental_matches_full_recompute():
+    games = make_games(25)
+    full = update_player_form(None, games)
+    assert_same_metrics(apply_one_by_one(games), full)
+    assert full["games"] == 25
+    assert len(full["stats"]["PTS"]["recent"]) == max(FORM_WINDOWS)
+
+
+def test_batches_match_full_recompute():
+    games = make_games(25)
+    state = update_player_form(None, games[:7])
+    state = update_player_form(state, games[7:19])
+    state = update_player_form(state, games[19:])
+    assert_same_metrics(state, update_player_form(None, games))
+
+
+def test_unsorted_input_is_applied_chronologically():
+    games = make_games(15)
+    shuffled = games[:]
+    random.Random(3).shuffle(shuffled)
+    assert_same_metrics(update_player_form(None, shuffled), update_player_form(None, games))
+    # La página lista los partidos del más reciente al más antiguo
+    assert_same_metrics(update_player_form(None, games[::-1]), update_player_form(None, games))
+
+
+def test_duplicate_and_old_dates_are_ignored():
+    games = make_games(12)
+    full = update_player_form(None, games)
+
+    duplicated = games + [dict(games[-1], PTS=99)]
+    assert_same_metrics(update_player_form(None, duplicated), full)
+    assert_same_metrics(apply_one_by_one(duplicated), full)
+
+    # Volver a aplicar partidos ya conocidos no cambia el estado
+    assert_same_metrics(update_player_form(full, games[-3:]), full)
+
+
+def test_previous_state_is_not_modified():
+    games = make_games(8)
+    state = update_player_form(None, games[:4])
+    snapshot = form_metrics(state)
+    update_player_form(state, games[4:])
+    assert form_metrics(state) == snapshot
@@ -0,0 +1,161 @@
+"""
+Consultas sobre listas de partidos: filtros, rangos de fechas, últimos N y cursores.
+"""
+import random
+
+import pytest
+
+from utils.dates import date_bound_id, date_id, format_date
+from utils.game_query import (
+    GameQuery, GameQueryIndex, decode_cursor, encode_cursor, team_query_index, team_query_response,
+)
+
+OPPONENTS = ["Boston Celtics", "Miami Heat", "Utah Jazz"]
+
+
+def make_games(n_games=60, seed=5):
+    rng = random.Random(seed)
+    games = []
+    for i in range(n_games):
+        date = format_date(1800 + rng.randint(0, 40))
+        if i % 17 == 0:
+            date = "fecha rara"
+        games.append({
+            "date": date,
+            "opponent": rng.choice(OPPONENTS),
+            "home_or_away": rng.choice(["home", "away"]),
+            "PTS": rng.randint(0, 40),
+            "REB": rng.randint(0, 15),
+            "n": i,
+        })
+    return games
+
+
+def brute_force(games, args):
+    """Resultado esperado recorriendo los partidos, del más reciente al más antiguo."""
+    query = GameQuery.from_args(args)
+    dated = sorted(
+        enumerate(games), key=lambda entry: (-(date_id(entry[1]["date"]) or -1), entry[0])
+    )
+    selected = []
+    for _, game in dated:
+        if any(game.get(key) != value for key, value in query.filters.items()):
+            continue
+        game_id = date_id(game["date"])
+        if query.date_from or query.date_to:
+            if game_id is None:
+                continue
+            if query.date_from and game_id < date_bound_id(query.date_from):
+                continue
+            if query.date_to and game_id > date_bound_id(query.date_to):
+                continue
+        selected.append(game["n"])
+    return selected[:query.last_n] if query.last_n else selected
+
+
+@pytest.mark.parametrize("args", [
+    {},
+    {"opponent": "Miami Heat"},
+    {"opponent": "Miami Heat", "home_or_away": "away"},
+    {"opponent": "Nadie"},
+    {"from": "2023-12-10"},
+    {"to": "20 dic 2023"},
+    {"from": "2023-12-05", "to": "2023-12-20", "home_or_away": "home"},
+    {"to": "2023-12-20", "from": "2023-12-25"},
+    {"opponent": "Utah Jazz", "last_n": "5"},
+    {"from": "2018-01-01"},
+    {"to": "2018-01-01"},
+])
+def test_positions_match_brute_force(args):
+    games = make_games()
+    index = GameQueryIndex(games, version="v1")
+    query = GameQuery.from_args(args)
+    assert [game["n"] for game in index.select(query)] == brute_force(games, args)
+
+
+def test_pre_origin_from_excludes_invalid_dates():
+    games = make_games()
+    index = GameQueryIndex(games)
+    selected = index.select(GameQuery.from_args({"from": "1 ene 2018"}))
+    assert selected
+    assert all(date_id(game["date"]) is not None for game in selected)
+    # Sin rango de fechas los partidos con fecha no válida sí se devuelven
+    assert any(game["date"] == "fecha rara" for game in index.select(GameQuery()))
+
+
+def test_page_walks_all_results_with_cursor():
+    games = make_games()
+    index = GameQueryIndex(games, version="v1")
+    expected = brute_force(games, {"home_or_away": "home"})
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        args = {"home_or_away": "home", "limit": "7"}
+        if cursor:
+            args["cursor"] = cursor
+        page, total, cursor = index.page(GameQuery.from_args(args))
+        assert total == len(expected)
+        seen.extend(game["n"] for game in page)
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == expected
+    assert pages == -(-len(expected) // 7)
+
+
+def test_page_rejects_cursor_from_other_version():
+    index = GameQueryIndex(make_games(), version="v2")
+    query = GameQuery.from_args({"cursor": encode_cursor(7, "v1")})
+    with pytest.raises(ValueError, match="caducado"):
+        index.page(query)
+
+
+def test_cursor_round_trip_and_invalid_cursor():
+    assert decode_cursor(encode_cursor(42, "abc")) == (42, "abc")
+    with pytest.raises(ValueError):
+        GameQuery.from_args({"cursor": "@@@"})
+
+
+@pytest.mark.parametrize("args", [
+    {"from": "garbage"}, {"to": "31 feb 2024"}, {"last_n": "0"}, {"limit": "x"}, {"home_or_away": "casa"},
+])
+def test_invalid_arguments_raise(args):
+    with pytest.raises(ValueError):
+        GameQuery.from_args(args)
+
+
+def test_fields_projection_keeps_identity_keys():
+    index = GameQueryIndex(make_games())
+    game = index.select(GameQuery.from_args({"fields": "PTS", "last_n": "1"}))[0]
+    assert set(game) == {"date", "opponent", "home_or_away", "PTS"}
+
+
+def make_team():
+    games = make_games(90)
+    players = {f"Jugador {i}": games[i * 30:(i + 1) * 30] for i in range(3)}
+    return {"team_name": "Denver Nuggets", "players": players}
+
+
+def test_team_query_response_filters_each_player():
+    team_data = make_team()
+    index = team_query_index(team_data, version="v1")
+    args = {"opponent": "Boston Celtics", "last_n": "3"}
+    response = team_query_response(index, team_data, GameQuery.from_args(args))
+
+    assert response["count"] == 3 and response["next_cursor"] is None
+    for player_name, games in team_data["players"].items():
+        assert [game["n"] for game in response["players"][player_name]] == brute_force(games, args)
+
+
+def test_team_query_response_paginates_roster_and_checks_version():
+    team_data = make_team()
+    index = team_query_index(team_data, version="v1")
+    first = team_query_response(index, team_data, GameQuery.from_args({"limit": "2"}))
+    assert list(first["players"]) == ["Jugador 0", "Jugador 1"]
+
+    second = team_query_response(index, team_data, GameQuery.from_args({"cursor": first["next_cursor"], "limit": "2"}))
+    assert list(second["players"]) == ["Jugador 2"] and second["next_cursor"] is None
+
+    stale = team_query_index(team_data, version="v2")
+    with pytest.raises(ValueError, match="caducado"):
+        team_query_response(stale, team_data, GameQuery.from_args({"cursor": first["next_cursor"]}))
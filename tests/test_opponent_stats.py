@@ -0,0 +1,92 @@
+"""
+El constructor de una sola pasada equivale al antiguo calculate_opponent_stats +
+process_opponent_stats (con date_ids.json), salvo el orden de las líneas: ahora siguen
+el orden de la lista de equipos y antes el de os.listdir.
+"""
+import json
+import os
+from collections import defaultdict
+
+import pytest
+
+from utils import storage_json
+from utils.dates import date_id
+from utils.opponent_stats import build_opponent_stats
+
+
+def old_pipeline(data_dir, file_names):
+    """Las dos etapas anteriores, leyendo los archivos en el orden indicado."""
+    opponent_stats = {}
+    for file_name in file_names:
+        with open(os.path.join(data_dir, file_name), "r") as file:
+            team_data = json.load(file)
+        for player_name, games in team_data["players"].items():
+            for game in games:
+                line = game.copy()
+                line["player"] = player_name
+                line["team"] = team_data["team_name"]
+                opponent_stats.setdefault(game["opponent"], []).append(line)
+    first_output = json.dumps(opponent_stats, indent=4)
+
+    opponent_stats = json.loads(first_output)
+    updated = {}
+    for team, games in opponent_stats.items():
+        with_ids, totals, unique_ids = [], defaultdict(float), set()
+        for game in games:
+            game_id = date_id(game.get("date"))
+            if not game_id:
+                continue
+            game["date_id"] = game_id
+            with_ids.append(game)
+            unique_ids.add(game_id)
+            for stat, value in game.items():
+                if isinstance(value, (int, float)):
+                    totals[stat] += value
+        averages = {stat: total / len(unique_ids) for stat, total in totals.items()} if unique_ids else {}
+        updated[team] = {"games": with_ids, "total": dict(totals), "average": averages}
+    return first_output, updated
+
+
+def build(season_data, tmp_path, monkeypatch, compact=False):
+    data_dir, team_names = season_data
+    monkeypatch.setattr(storage_json, "JSON_COMPACT", compact)
+    output, updated = tmp_path / "opponent_stats.json", tmp_path / "opponent_stats_updated.json"
+    build_opponent_stats(str(data_dir), team_names, str(output), str(updated), workers=1)
+    with open(updated, encoding="utf-8") as file:
+        return output.read_text(), json.load(file)
+
+
+def test_matches_old_pipeline_in_team_list_order(season_data, tmp_path, monkeypatch):
+    data_dir, team_names = season_data
+    output, updated = build(season_data, tmp_path, monkeypatch)
+    old_output, old_updated = old_pipeline(data_dir, [f"{team}.json" for team in team_names])
+
+    # opponent_stats.json: mismos bytes que json.dump(indent=4)
+    assert output == old_output
+    # opponent_stats_updated.json: mismo contenido (las claves de "total" van en el orden de STAT_KEYS)
+    assert updated == old_updated
+    assert all(game["date"] != "fecha rara" for entry in updated.values() for game in entry["games"])
+
+
+def test_listdir_order_only_changes_line_order(season_data, tmp_path, monkeypatch):
+    data_dir, team_names = season_data
+    _, updated = build(season_data, tmp_path, monkeypatch)
+    _, old_updated = old_pipeline(data_dir, os.listdir(data_dir))
+
+    def line_key(game):
+        return game["team"], game["player"], game["date"]
+
+    assert updated.keys() == old_updated.keys()
+    for opponent, entry in updated.items():
+        old_entry = old_updated[opponent]
+        assert sorted(entry["games"], key=line_key) == sorted(old_entry["games"], key=line_key)
+        # Las sumas en coma flotante pueden variar en el último bit con otro orden
+        assert entry["total"] == pytest.approx(old_entry["total"])
+        assert entry["average"] == pytest.approx(old_entry["average"])
+
+
+def test_compact_output_parses_to_same_document(season_data, tmp_path, monkeypatch):
+    indented, _ = build(season_data, tmp_path, monkeypatch, compact=False)
+    compact, _ = build(season_data, tmp_path, monkeypatch, compact=True)
+    assert len(compact) < len(indented)
+    assert json.loads(compact) == json.loads(indented)
@@ -0,0 +1,54 @@
+"""
+Paridad de los backends de parseo de partidos sobre páginas guardadas en tests/fixtures.
+"""
+import os
+
+import pytest
+
+from utils.instrumentation import PageStats
+from utils.parsers import GAME_LOG_PARSERS
+from utils.scraper import build_player_stats
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FAST_BACKENDS = sorted(name for name in GAME_LOG_PARSERS if name != "bs4")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+PAGES = sorted(name for name in os.listdir(FIXTURES_DIR) if name.startswith("partidos"))
+
+
+@pytest.mark.parametrize("name", PAGES)
+@pytest.mark.parametrize("backend", sorted(GAME_LOG_PARSERS))
+def test_backend_matches_reference(name, backend):
+    html = load_fixture(name)
+    expected = build_player_stats(GAME_LOG_PARSERS["bs4"](html))
+    assert build_player_stats(GAME_LOG_PARSERS[backend](html)) == expected
+
+
+@pytest.mark.parametrize("name", ["partidos.html", "partidos_table_stats.html"])
+def test_fixtures_have_games(name):
+    # Las páginas bien formadas deben producir partidos (si no, la paridad no comprueba nada)
+    assert build_player_stats(GAME_LOG_PARSERS["bs4"](load_fixture(name)))
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_unclosed_cells_outside_stats_table_keep_fast_path(backend):
+    html = load_fixture("partidos.html").replace(
+        '<div class="home-player__card">',
+        "<table class='nav'><tr><td>menu</table><script>var cell = '<td>';</script><div class=\"home-player__card\">",
+    )
+    page_stats = PageStats(None)
+    rows = GAME_LOG_PARSERS[backend](html, page_stats)
+    assert page_stats.parser_fallbacks == 0
+    assert build_player_stats(rows) == build_player_stats(GAME_LOG_PARSERS["bs4"](html))
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_unclosed_stats_table_falls_back_and_is_counted(backend):
+    page_stats = PageStats(None)
+    GAME_LOG_PARSERS[backend](load_fixture("partidos_unclosed.html"), page_stats)
+    assert page_stats.parser_fallbacks == 1
@@ -0,0 +1,45 @@
+"""
+Lecturas de SQLite: las líneas de todos los oponentes salen de una sola consulta con el
+mismo resultado que consultar cada oponente, y lo reconstruido se reutiliza mientras la
+base de datos no cambie.
+"""
+import pytest
+
+from utils import storage_sqlite
+
+
+@pytest.fixture
+def database(season_data, tmp_path):
+    data_dir, team_names = season_data
+    path = str(tmp_path / "stats.db")
+    assert sorted(storage_sqlite.import_json_dir(str(data_dir), path)) == sorted(team_names)
+    return path, team_names
+
+
+def test_all_opponent_lines_match_per_opponent_queries(database):
+    path, team_names = database
+    by_opponent = storage_sqlite.get_all_opponent_lines(path)
+    assert list(by_opponent) == sorted(team_names)
+    for opponent, lines in by_opponent.items():
+        assert lines == storage_sqlite.get_opponent_lines(opponent, path)
+
+
+def test_cached_reads_until_the_database_changes(database):
+    path, team_names = database
+    builds = []
+
+    def build():
+        builds.append(1)
+        return storage_sqlite.get_all_opponent_lines(path)
+
+    first = storage_sqlite.cached("lines", build, path)
+    assert storage_sqlite.cached("lines", build, path) is first
+    team = storage_sqlite.load_team_cached(team_names[0], path)
+    assert storage_sqlite.load_team_cached(team_names[0], path) is team
+    assert len(builds) == 1
+
+    changed = dict(team, players={name: games[:-1] for name, games in team["players"].items()})
+    storage_sqlite.save_team(changed, path)
+    assert storage_sqlite.cached("lines", build, path) is not first
+    assert len(builds) == 2
+    assert storage_sqlite.load_team_cached(team_names[0], path)["players"] == changed["players"]
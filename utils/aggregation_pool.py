@@ -0,0 +1,59 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Procesos para las etapas de agregación posteriores al scraping (1 = modo secuencial)
+AGGREGATION_WORKERS = int(os.environ.get("AGGREGATION_WORKERS", str(os.cpu_count() or 1)))
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+# Si el pool se rompe una vez (p. ej. "spawn" no puede reimportar __main__) no se vuelve
+# a crear: el resto de agregaciones del proceso se hacen en serie
+_pool_broken = False
+
+
+def _get_executor(workers):
+    """Pool de procesos compartido; se crea con "spawn" porque la app usa hilos."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = workers
+        return _executor
+
+
+def map_ordered(func, items, workers=None):
+    """
+    Aplica `func` a cada elemento y devuelve los resultados en el orden de entrada.
+    Con más de un worker se reparte el trabajo en el pool de procesos; el orden del
+    resultado es siempre el mismo, de modo que la fusión posterior es determinista.
+    Si el pool se rompe (p. ej. un proceso muere), se cierra, se repite en serie y las
+    llamadas siguientes ya no usan procesos.
+    """
+    items = list(items)
+    workers = workers or AGGREGATION_WORKERS
+    if workers <= 1 or len(items) <= 1 or _pool_broken:
+        return [func(item) for item in items]
+    try:
+        return list(_get_executor(workers).map(func, items))
+    except BrokenProcessPool as e:
+        logging.warning(f"Pool de agregación roto ({e}); se procesa en serie a partir de ahora.")
+        _discard_broken_executor()
+        return [func(item) for item in items]
+
+
+def _discard_broken_executor():
+    global _executor, _executor_workers, _pool_broken
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_workers = None
+        _pool_broken = True
@@ -0,0 +1,110 @@
+"""
+Benchmark de serialización JSON sobre una temporada completa generada.
+
+Uso:
+    python -m utils.bench_json [repeticiones]
+
+Genera 30 equipos de 15 jugadores con 82 partidos cada uno (misma forma que los JSON
+de data/), agrupa las líneas por oponente como opponent_stats.json y mide, para cada
+backend disponible, el tiempo de codificar y decodificar los documentos de equipo y el
+archivo por oponente. También comprueba que todos los backends producen datos iguales.
+"""
+import sys
+import time
+import random
+import datetime
+
+from utils.json_provider import JSON_BACKENDS
+from utils.dates import MESES_ESPANOL
+
+TEAMS = 30
+PLAYERS_PER_TEAM = 15
+GAMES_PER_PLAYER = 82
+
+
+def generate_season(seed=0):
+    """Documentos de equipo y líneas por oponente de una temporada sintética."""
+    rng = random.Random(seed)
+    team_names = [f"Team {i:02d}" for i in range(TEAMS)]
+    start = datetime.date(2024, 10, 22)
+    teams = []
+    by_opponent = {}
+    for team_name in team_names:
+        players = {}
+        for p in range(PLAYERS_PER_TEAM):
+            player_name = f"{team_name} Player {p:02d}"
+            games = []
+            for g in range(GAMES_PER_PLAYER):
+                day = start + datetime.timedelta(days=2 * g)
+                opponent = rng.choice([name for name in team_names if name != team_name])
+                pts, reb, ast = (float(rng.randint(0, 40)), float(rng.randint(0, 15)), float(rng.randint(0, 12)))
+                game = {
+                    "date": f"{day.day} {MESES_ESPANOL[day.month - 1]} {day.year}",
+                    "opponent": opponent,
+                    "home_or_away": rng.choice(["home", "away"]),
+                    "PTS": pts, "REB": reb, "AST": ast, "MIN": float(rng.randint(5, 42)),
+                    "2M": float(rng.randint(0, 12)), "2A": float(rng.randint(0, 20)),
+                    "3M": float(rng.randint(0, 6)), "3A": float(rng.randint(0, 12)),
+                    "STL": float(rng.randint(0, 4)), "BLK": float(rng.randint(0, 4)),
+                    "TO": float(rng.randint(0, 6)),
+                    "PTS+AST": pts + ast, "REB+AST": reb + ast, "PTS+REB": pts + reb,
+                    "PTS+REB+AST": pts + reb + ast,
+                }
+                games.append(game)
+                by_opponent.setdefault(opponent, []).append(dict(game, player=player_name, team=team_name))
+            players[player_name] = games
+        teams.append({"team_name": team_name, "players": players, "global_stats": {}})
+    return teams, by_opponent
+
+
+def benchmark(documents, repeat):
+    """Tiempos medios (ms) de codificación y decodificación por backend."""
+    results = {}
+    for name, backend in JSON_BACKENDS.items():
+        encoded = [backend.dumps_bytes(document, sort_keys=True) for document in documents]
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for document in documents:
+                backend.dumps_bytes(document, sort_keys=True)
+        encode_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for data in encoded:
+                backend.loads(data)
+        decode_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        results[name] = (encode_ms, decode_ms, sum(len(data) for data in encoded))
+    return results
+
+
+def check_parity(documents):
+    """Devuelve los backends cuyo resultado, decodificado, difiere del de stdlib."""
+    reference = JSON_BACKENDS["stdlib"]
+    expected = [reference.loads(reference.dumps_bytes(document)) for document in documents]
+    return [
+        name for name, backend in JSON_BACKENDS.items()
+        if [reference.loads(backend.dumps_bytes(document)) for document in documents] != expected
+    ]
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    teams, by_opponent = generate_season()
+
+    mismatches = check_parity(teams + [by_opponent])
+    for name in mismatches:
+        print(f"DIFERENCIA: {name}")
+
+    for label, documents in (("equipos", teams), ("oponentes", [by_opponent])):
+        print(f"{label}:")
+        baseline = None
+        for name, (encode_ms, decode_ms, size) in benchmark(documents, repeat).items():
+            baseline = baseline or (encode_ms, decode_ms)
+            print(
+                f"  {name:8s} codificar {encode_ms:8.1f} ms  x{baseline[0] / encode_ms:4.1f}"
+                f"   decodificar {decode_ms:8.1f} ms  x{baseline[1] / decode_ms:4.1f}   {size / 1e6:.1f} MB"
+            )
+
+    sys.exit(1 if mismatches else 0)
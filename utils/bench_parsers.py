@@ -0,0 +1,82 @@
+"""
+Micro-benchmark y comprobación de paridad de los backends de parseo de partidos.
+
+Uso:
+    python -m utils.bench_parsers [carpeta con .html o caché HTTP] [repeticiones]
+
+Sin carpeta se usan las páginas guardadas en tests/fixtures.
+
+Para cada página guardada se comprueba que todos los backends producen exactamente
+las mismas estadísticas que el parser de referencia (bs4) y se mide el tiempo medio.
+Las páginas pueden ser archivos .html o entradas .cache de la caché HTTP.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+
+from utils.parsers import GAME_LOG_PARSERS
+from utils.scraper import build_player_stats
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures")
+
+
+def load_pages(directory):
+    """Carga los HTML de una carpeta (archivos .html o entradas de la caché HTTP)."""
+    pages = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith(".html"):
+            with open(path, "r", encoding="utf-8") as file:
+                pages[name] = file.read()
+        elif name.endswith(".cache"):
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                entry = json.load(file)
+            if entry.get("url", "").endswith("/partidos"):
+                pages[entry["url"]] = entry["body"]
+    return pages
+
+
+def check_parity(pages):
+    """Devuelve la lista de (página, backend) cuyo resultado difiere del de bs4."""
+    mismatches = []
+    for name, html in pages.items():
+        expected = build_player_stats(GAME_LOG_PARSERS["bs4"](html))
+        for backend, parse in GAME_LOG_PARSERS.items():
+            if build_player_stats(parse(html)) != expected:
+                mismatches.append((name, backend))
+    return mismatches
+
+
+def benchmark(pages, repeat):
+    """Tiempo medio por página (ms) de cada backend."""
+    results = {}
+    for backend, parse in GAME_LOG_PARSERS.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for html in pages.values():
+                build_player_stats(parse(html))
+        elapsed = time.perf_counter() - start
+        results[backend] = elapsed * 1000 / (repeat * len(pages))
+    return results
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else FIXTURES_DIR
+    pages = load_pages(directory)
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    if not pages:
+        print(f"No se encontraron páginas en {directory}")
+        sys.exit(2)
+
+    mismatches = check_parity(pages)
+    for name, backend in mismatches:
+        print(f"DIFERENCIA: {backend} en {name}")
+
+    baseline = None
+    for backend, ms in benchmark(pages, repeat).items():
+        baseline = baseline or ms
+        print(f"{backend:10s} {ms:8.2f} ms/página  x{baseline / ms:.1f}")
+
+    sys.exit(1 if mismatches else 0)
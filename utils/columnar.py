@@ -0,0 +1,366 @@
+"""
+Representación columnar de todos los partidos para cálculos vectorizados.
+
+Cada partido es una fila; las estadísticas forman una matriz (partidos x estadísticas)
+y equipo, oponente, jugador y local/visitante se guardan como códigos categóricos.
+En el refresco se construye en la misma lectura de los archivos de equipo que las
+líneas por oponente (utils.opponent_stats) y de ella salen los totales permitidos
+por oponente y los perfiles defensivos. Se persiste en formato binario comprimido de
+NumPy (.npz, ColumnStore) y los índices de aciertos se construyen desde ese archivo
+sin volver a leer los JSON de equipo.
+"""
+import os
+from operator import itemgetter
+
+import numpy as np
+
+from utils.dates import date_id, INVALID_DATE_ID
+
+COLUMNAR_FILE = os.path.join("data", "games.npz")
+
+# Estadísticas numéricas de cada partido, en el orden de las columnas de la matriz
+STAT_KEYS = [
+    "PTS", "REB", "AST", "MIN", "2M", "2A", "3M", "3A", "STL", "BLK", "TO",
+    "PTS+AST", "REB+AST", "PTS+REB", "PTS+REB+AST",
+]
+STAT_INDEX = {key: i for i, key in enumerate(STAT_KEYS)}
+
+
+class GameColumns:
+    """
+    Columnas de partidos:
+      values       float64 (n, len(STAT_KEYS)); NaN si la estadística no existe
+      team, opponent, player  códigos enteros sobre `teams` y `players`
+      date_id      int32 (días desde 2019-01-01 + 1; INVALID_DATE_ID si la fecha no es válida)
+      home         bool
+      position     int32, posición del partido en la lista original del jugador
+      player_order int32, posición del jugador en la plantilla de su equipo
+    """
+
+    FIELDS = ("values", "team", "opponent", "player", "date_id", "home", "position", "player_order")
+
+    def __init__(self, teams, players, **columns):
+        self.teams = list(teams)
+        self.players = list(players)
+        for field in self.FIELDS:
+            setattr(self, field, columns[field])
+
+    def __len__(self):
+        return len(self.date_id)
+
+    @classmethod
+    def from_team_documents(cls, team_documents):
+        """Construye las columnas en una sola pasada sobre los documentos de equipo."""
+        team_codes = {}
+        player_codes = {}
+        rows = []
+        meta = []
+
+        def code(codes, name):
+            value = codes.get(name)
+            if value is None:
+                value = codes[name] = len(codes)
+            return value
+
+        for team_data in team_documents:
+            team_name = team_data.get("team_name")
+            if not team_name:
+                continue
+            team = code(team_codes, team_name)
+            for player_order, (player_name, games) in enumerate(team_data.get("players", {}).items()):
+                player = code(player_codes, player_name)
+                for position, game in enumerate(games):
+                    opponent = game.get("opponent")
+                    if not opponent:
+                        continue
+                    rows.append([game.get(key, np.nan) for key in STAT_KEYS])
+                    meta.append((
+                        team, code(team_codes, opponent), player,
+                        date_id(game.get("date")) or INVALID_DATE_ID,
+                        game.get("home_or_away") == "home",
+                        position, player_order,
+                    ))
+
+        meta = np.array(meta, dtype=np.int64).reshape(-1, 7)
+        return cls(
+            teams=team_codes,
+            players=player_codes,
+            values=np.array(rows, dtype=np.float64).reshape(-1, len(STAT_KEYS)),
+            team=meta[:, 0].astype(np.int16),
+            opponent=meta[:, 1].astype(np.int16),
+            player=meta[:, 2].astype(np.int32),
+            date_id=meta[:, 3].astype(np.int32),
+            home=meta[:, 4].astype(bool),
+            position=meta[:, 5].astype(np.int32),
+            player_order=meta[:, 6].astype(np.int32),
+        )
+
+    @classmethod
+    def from_player_stats(cls, player_stats):
+        """
+        Construcción rápida para un solo equipo ({jugador: [partidos]}): las filas se
+        extraen con itemgetter y no se interpretan fechas ni oponentes.
+        """
+        getter = itemgetter(*STAT_KEYS)
+        rows = []
+        homes = []
+        counts = []
+        for games in player_stats.values():
+            try:
+                rows.extend(map(getter, games))
+            except KeyError:
+                rows.extend([game.get(key, np.nan) for key in STAT_KEYS] for game in games)
+            homes.extend([game.get("home_or_away") == "home" for game in games])
+            counts.append(len(games))
+
+        n_rows = len(rows)
+        positions = np.arange(n_rows, dtype=np.int32)
+        player = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        starts = np.repeat(np.cumsum([0] + counts[:-1]).astype(np.int32), counts) if counts else positions
+        return cls(
+            teams=[],
+            players=list(player_stats),
+            values=np.array(rows, dtype=np.float64).reshape(-1, len(STAT_KEYS)),
+            team=np.zeros(n_rows, dtype=np.int16),
+            opponent=np.zeros(n_rows, dtype=np.int16),
+            player=player,
+            date_id=np.full(n_rows, INVALID_DATE_ID, dtype=np.int32),
+            home=np.array(homes, dtype=bool),
+            position=positions - starts,
+            player_order=player,
+        )
+
+    @classmethod
+    def concat(cls, parts):
+        """
+        Une varios bloques de columnas (p. ej. uno por equipo) en el orden dado,
+        recodificando equipos y jugadores sobre un vocabulario común. El resultado es
+        el mismo que construir todas las filas en una sola pasada.
+        """
+        team_codes = {}
+        player_codes = {}
+        columns = {field: [] for field in cls.FIELDS}
+        for part in parts:
+            team_map = np.array([team_codes.setdefault(name, len(team_codes)) for name in part.teams], dtype=np.int16)
+            player_map = np.array([player_codes.setdefault(name, len(player_codes)) for name in part.players], dtype=np.int32)
+            for field in cls.FIELDS:
+                value = getattr(part, field)
+                if field in ("team", "opponent"):
+                    value = team_map[value] if len(value) else value
+                elif field == "player":
+                    value = player_map[value] if len(value) else value
+                columns[field].append(value)
+
+        if not columns["values"]:
+            return cls.from_team_documents([])
+        return cls(
+            teams=team_codes,
+            players=player_codes,
+            **{field: np.concatenate(values) for field, values in columns.items()},
+        )
+
+    def stat(self, key):
+        """Columna de una estadística."""
+        return self.values[:, STAT_INDEX[key]]
+
+
+class ColumnStore:
+    """
+    Columnas de todos los partidos guardadas en un .npz junto con, por equipo, su
+    plantilla y la versión (mtime en ns, tamaño) del JSON del que se leyeron. Un equipo
+    solo se sirve desde el almacén mientras su archivo no haya cambiado; si se ha
+    vuelto a scrapear después del refresco, team() devuelve None.
+    """
+
+    def __init__(self, columns, sources, rosters):
+        self.columns = columns
+        self.sources = dict(sources)
+        self.rosters = dict(rosters)
+
+    def save(self, path=COLUMNAR_FILE):
+        """Guarda el almacén en un .npz comprimido (escritura atómica)."""
+        source_teams = list(self.sources)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            teams=np.array(self.columns.teams, dtype=str),
+            players=np.array(self.columns.players, dtype=str),
+            source_teams=np.array(source_teams, dtype=str),
+            source_versions=np.array([self.sources[team] for team in source_teams], dtype=np.int64).reshape(-1, 2),
+            roster_sizes=np.array([len(self.rosters[team]) for team in source_teams], dtype=np.int32),
+            roster_players=np.array([name for team in source_teams for name in self.rosters[team]], dtype=str),
+            **{field: getattr(self.columns, field) for field in GameColumns.FIELDS},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=COLUMNAR_FILE):
+        """Carga un almacén guardado con save()."""
+        with np.load(path) as data:
+            columns = GameColumns(
+                teams=data["teams"].tolist(),
+                players=data["players"].tolist(),
+                **{field: data[field] for field in GameColumns.FIELDS},
+            )
+            source_teams = data["source_teams"].tolist()
+            versions = [tuple(version) for version in data["source_versions"].tolist()]
+            bounds = np.cumsum(data["roster_sizes"]).tolist()
+            roster_players = data["roster_players"].tolist()
+        rosters = {
+            team: roster_players[start:end]
+            for team, start, end in zip(source_teams, [0] + bounds[:-1], bounds)
+        }
+        return cls(columns, dict(zip(source_teams, versions)), rosters)
+
+    def team(self, team_name, version):
+        """
+        (plantilla, columnas) de un equipo si el almacén está al día con la versión
+        `version` de su JSON, o None. En las columnas del equipo el código de jugador es
+        su posición en la plantilla y las filas siguen el orden del documento.
+        """
+        if self.sources.get(team_name) != tuple(version):
+            return None
+        rows = np.flatnonzero(self.columns.team == self.columns.teams.index(team_name))
+        roster = self.rosters[team_name]
+        player_order = self.columns.player_order[rows]
+        return roster, GameColumns(
+            teams=self.columns.teams,
+            players=roster,
+            values=self.columns.values[rows],
+            team=self.columns.team[rows],
+            opponent=self.columns.opponent[rows],
+            player=player_order,
+            date_id=self.columns.date_id[rows],
+            home=self.columns.home[rows],
+            position=self.columns.position[rows],
+            player_order=player_order,
+        )
+
+
+def mean_by_stat(columns, mask, keys):
+    """Media redondeada de cada estadística sobre las filas de `mask` (ignora NaN)."""
+    values = columns.values[mask][:, [STAT_INDEX[key] for key in keys]].astype(np.float64)
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    sums = np.nansum(values, axis=0)
+    return {key: round(float(sums[i] / counts[i]), 2) for i, key in enumerate(keys) if counts[i]}
+
+
+def opponent_totals(columns):
+    """
+    Totales y medias permitidas por oponente, vectorizado con bincount.
+
+    Reproduce process_opponent_stats: se suman todas las estadísticas numéricas
+    (incluido date_id) y la media se divide por el número de fechas distintas.
+    Solo cuentan los partidos con fecha válida.
+    """
+    valid = columns.date_id != INVALID_DATE_ID
+    opponent = columns.opponent[valid].astype(np.int64)
+    values = columns.values[valid].astype(np.float64)
+    ids = columns.date_id[valid].astype(np.int64)
+    n_teams = len(columns.teams)
+
+    present = ~np.isnan(values)
+    sums = np.stack([
+        np.bincount(opponent, weights=np.where(present[:, i], values[:, i], 0.0), minlength=n_teams)
+        for i in range(len(STAT_KEYS))
+    ], axis=1)
+    has_stat = np.stack([
+        np.bincount(opponent, weights=present[:, i], minlength=n_teams) > 0
+        for i in range(len(STAT_KEYS))
+    ], axis=1)
+    date_sums = np.bincount(opponent, weights=ids, minlength=n_teams)
+
+    unique_pairs = np.unique(opponent * (ids.max(initial=0) + 1) + ids)
+    unique_dates = np.bincount(unique_pairs // (ids.max(initial=0) + 1), minlength=n_teams)
+
+    result = {}
+    for code in np.unique(opponent).tolist():
+        totals = {key: float(sums[code, i]) for i, key in enumerate(STAT_KEYS) if has_stat[code, i]}
+        totals["date_id"] = float(date_sums[code])
+        num_games = int(unique_dates[code])
+        averages = {stat: total / num_games for stat, total in totals.items()} if num_games else {}
+        result[columns.teams[code]] = {"total": totals, "average": averages}
+    return result
+
+
+def _hit_thresholds(sorted_values, counts):
+    """
+    Valores superados el 90%, 80% y 70% de las veces (como en generate_player_graph):
+    sorted_values[int(n * 0.1)], [int(n * 0.2)] y [int(n * 0.3)] por columna.
+    """
+    thresholds = {}
+    columns = np.arange(sorted_values.shape[1])
+    for label, fraction in (("hit_90", 0.1), ("hit_80", 0.2), ("hit_70", 0.3)):
+        index = np.minimum((counts * fraction).astype(np.int64), np.maximum(counts - 1, 0))
+        thresholds[label] = sorted_values[index, columns]
+    return thresholds
+
+
+def distribution_stats(columns, keys, mask=None):
+    """
+    Métricas de distribución en una sola pasada vectorizada sobre la matriz de partidos:
+      distribution: media, mediana, desviación típica, mínimo, máximo y umbrales 90/80/70
+      by_player:    media de cada estadística por jugador
+      by_venue:     media de cada estadística en casa y fuera
+    """
+    rows = slice(None) if mask is None else mask
+    values = columns.values[rows][:, [STAT_INDEX[key] for key in keys]].astype(np.float64)
+    player = columns.player[rows].astype(np.int64)
+    home = columns.home[rows]
+    if len(values) == 0:
+        return {"distribution": {}, "by_player": {}, "by_venue": {}}
+
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    filled = np.where(present, values, 0.0)
+    sums = filled.sum(axis=0)
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    sq = np.where(present, (values - means) ** 2, 0.0).sum(axis=0)
+    stds = np.sqrt(np.divide(sq, counts, out=np.zeros_like(sq), where=counts > 0))
+
+    # np.sort deja los NaN al final, así que los índices válidos son [0, counts)
+    sorted_values = np.sort(values, axis=0)
+    lower = sorted_values[np.maximum((counts - 1) // 2, 0), np.arange(len(keys))]
+    upper = sorted_values[np.maximum(counts // 2, 0), np.arange(len(keys))]
+    medians = (lower + upper) / 2
+    thresholds = _hit_thresholds(sorted_values, counts)
+    minimums = sorted_values[0]
+    maximums = sorted_values[np.maximum(counts - 1, 0), np.arange(len(keys))]
+
+    means, medians, stds = means.tolist(), medians.tolist(), stds.tolist()
+    minimums, maximums = minimums.tolist(), maximums.tolist()
+    thresholds = {label: column.tolist() for label, column in thresholds.items()}
+    distribution = {}
+    for i, key in enumerate(keys):
+        if not counts[i]:
+            continue
+        distribution[key] = {
+            "mean": round(means[i], 2),
+            "median": round(medians[i], 2),
+            "std": round(stds[i], 2),
+            "min": minimums[i],
+            "max": maximums[i],
+            **{label: column[i] for label, column in thresholds.items()},
+        }
+
+    def grouped_means(groups, n_groups):
+        group_sums = np.stack([np.bincount(groups, weights=filled[:, i], minlength=n_groups) for i in range(len(keys))], axis=1)
+        group_counts = np.stack([np.bincount(groups, weights=present[:, i], minlength=n_groups) for i in range(len(keys))], axis=1)
+        return np.divide(group_sums, group_counts, out=np.full_like(group_sums, np.nan), where=group_counts > 0)
+
+    def as_dict(row):
+        # x == x descarta los NaN
+        return {key: round(value, 2) for key, value in zip(keys, row) if value == value}
+
+    player_means = grouped_means(player, len(columns.players)).tolist()
+    by_player = {columns.players[code]: as_dict(player_means[code]) for code in np.unique(player).tolist()}
+
+    venue_means = grouped_means(home.astype(np.int64), 2).tolist()
+    home_games = int(home.sum())
+    by_venue = {
+        venue: as_dict(venue_means[code])
+        for venue, code, n_games in (("home", 1, home_games), ("away", 0, len(home) - home_games))
+        if n_games
+    }
+
+    return {"distribution": distribution, "by_player": by_player, "by_venue": by_venue}
@@ -0,0 +1,79 @@
+import os
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional; sin él solo se comprime con gzip
+    brotli = None
+
+# Tamaño mínimo (bytes) a partir del cual se comprimen las respuestas
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+
+# Niveles por petición (rápidos) y para las respuestas precomprimidas al refrescar
+COMPRESS_LEVELS = {"br": 5, "gzip": 6}
+PRECOMPRESS_LEVELS = {"br": 9, "gzip": 9}
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body, encoding, levels=COMPRESS_LEVELS):
+    """Comprime `body` (bytes) con la codificación indicada ("br" o "gzip")."""
+    if encoding == "br":
+        return brotli.compress(body, quality=levels["br"])
+    return gzip.compress(body, compresslevel=levels["gzip"], mtime=0)
+
+
+def precompress(body):
+    """Variantes comprimidas de una respuesta que se sirve muchas veces sin cambios."""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return {}
+    return {encoding: compress(body, encoding, PRECOMPRESS_LEVELS) for encoding in ENCODINGS}
+
+
+def accepted_encoding():
+    """Mejor codificación aceptada por el cliente (brotli antes que gzip), o None."""
+    accept = request.accept_encodings
+    for encoding in ENCODINGS:
+        if accept[encoding]:
+            return encoding
+    return None
+
+
+def _set_encoded(response, encoding, body):
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+
+
+def encoded_response(response, variants):
+    """Sustituye el cuerpo por la variante precomprimida que acepte el cliente."""
+    encoding = accepted_encoding()
+    response.vary.add("Accept-Encoding")
+    if encoding in variants:
+        _set_encoded(response, encoding, variants[encoding])
+    return response
+
+
+def compress_response(response):
+    """
+    Hook after_request: comprime las respuestas JSON grandes que aún no lo están,
+    según el Accept-Encoding del cliente.
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype != "application/json"
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    encoding = accepted_encoding()
+    if encoding is not None:
+        _set_encoded(response, encoding, compress(body, encoding))
+    return response
@@ -0,0 +1,99 @@
+import datetime
+from functools import lru_cache
+
+import numpy as np
+
+# Abreviaturas de meses usadas por proballers ("1 ene 2024")
+MESES_ESPANOL = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
+_MES_A_NUMERO = {mes: i + 1 for i, mes in enumerate(MESES_ESPANOL)}
+
+# Día 1 de la numeración de fechas (mismo origen que el antiguo date_ids.json)
+DATE_ID_ORIGIN = datetime.date(2019, 1, 1)
+_ORIGIN_ORDINAL = DATE_ID_ORIGIN.toordinal() - 1
+
+# Valor usado en los arrays de date_id para fechas no válidas
+INVALID_DATE_ID = -1
+
+# Una temporada completa tiene unas pocas centenas de fechas distintas
+_PARSE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def parse_date(date_str):
+    """
+    Convierte una fecha en formato "1 ene 2024" a datetime.date.
+    Devuelve None si el texto no tiene ese formato.
+    """
+    try:
+        dia, mes, anio = date_str.split()
+        return datetime.date(int(anio), _MES_A_NUMERO[mes.lower().rstrip(".")[:3]], int(dia))
+    except (AttributeError, ValueError, KeyError):
+        return None
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def date_id(date_str):
+    """
+    Devuelve el identificador de una fecha: días desde 2019-01-01 más uno ("1 ene 2019" -> 1).
+    Se calcula aritméticamente, sin límite superior. Devuelve None si la fecha no se puede
+    interpretar o es anterior al origen.
+    """
+    parsed = parse_date(date_str)
+    if parsed is None:
+        return None
+    value = parsed.toordinal() - _ORIGIN_ORDINAL
+    return value if value >= 1 else None
+
+
+def date_from_id(value):
+    """Fecha (datetime.date) correspondiente a un date_id."""
+    return datetime.date.fromordinal(_ORIGIN_ORDINAL + value)
+
+
+def format_date(value):
+    """Texto en formato proballers ("1 ene 2024") de un date_id."""
+    day = date_from_id(value)
+    return f"{day.day} {MESES_ESPANOL[day.month - 1]} {day.year}"
+
+
+def date_ids_array(date_strings):
+    """
+    Versión vectorizada de date_id para una columna de fechas: cada fecha distinta se
+    interpreta una sola vez. Las fechas no válidas quedan como INVALID_DATE_ID.
+    """
+    values = [text if isinstance(text, str) else "" for text in date_strings]
+    if not values:
+        return np.empty(0, dtype=np.int32)
+    unique, inverse = np.unique(np.array(values, dtype=str), return_inverse=True)
+    ids = np.fromiter(
+        ((date_id(text) or INVALID_DATE_ID) for text in unique.tolist()),
+        dtype=np.int32,
+        count=len(unique),
+    )
+    return ids[inverse.reshape(-1)]
+
+
+def date_bound_id(value):
+    """
+    date_id de un extremo de rango en texto ("1 ene 2024" o ISO "2024-01-01"), sin
+    límite inferior. Devuelve None si el texto no es una fecha.
+    """
+    try:
+        parsed = datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        parsed = parse_date(value)
+    if parsed is None:
+        return None
+    return parsed.toordinal() - _ORIGIN_ORDINAL
+
+
+def date_id_range(date_from=None, date_to=None):
+    """
+    Convierte un rango de fechas (textos "1 ene 2024" o ISO "2024-01-01") en un par de
+    date_id (mínimo, máximo) para filtrar con comparaciones enteras. Los extremos
+    ausentes quedan abiertos (GameQuery.from_args ya rechaza los que no son fechas).
+    El mínimo nunca es menor que 1, de modo que INVALID_DATE_ID queda siempre fuera.
+    """
+    low = date_bound_id(date_from) if date_from else None
+    high = date_bound_id(date_to) if date_to else None
+    return (max(low, 1) if low is not None else 1, high if high is not None else np.iinfo(np.int32).max)
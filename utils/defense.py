@@ -0,0 +1,90 @@
+"""
+Perfil defensivo de cada equipo: estadísticas que permite por partido (suma de los
+jugadores rivales en cada partido), en la temporada, en los últimos 5 y 10 partidos y
+separado según juegue en casa o fuera.
+
+Se calcula en el refresco a partir de las columnas de partidos (GameColumns) que construye
+la agregación por oponente y se guarda en DEFENSE_FILE para servirlo sin recorrer
+opponent_stats.json.
+"""
+import os
+
+import numpy as np
+
+from utils.columnar import STAT_KEYS, STAT_INDEX
+from utils.dates import INVALID_DATE_ID, format_date
+
+DEFENSE_FILE = os.path.join("data", "defensive_profiles.json")
+
+# Estadísticas del perfil (los minutos permitidos no aportan nada)
+PROFILE_STAT_KEYS = [key for key in STAT_KEYS if key != "MIN"]
+
+# Ventanas de partidos recientes
+RECENT_WINDOWS = (5, 10)
+
+
+def _per_game(totals, present):
+    """Media por partido de cada estadística (solo las que aparecen en algún partido)."""
+    if len(totals) == 0:
+        return {}
+    means = totals.mean(axis=0).tolist()
+    has_stat = present.any(axis=0).tolist()
+    return {key: round(means[i], 2) for i, key in enumerate(PROFILE_STAT_KEYS) if has_stat[i]}
+
+
+def _block(totals, present):
+    return {"games": len(totals), "per_game": _per_game(totals, present)}
+
+
+def defensive_profiles(columns):
+    """
+    Perfiles de todos los equipos con una pasada vectorizada: las líneas se agrupan por
+    (defensa, fecha) con bincount y cada defensa ocupa un tramo contiguo de partidos.
+    """
+    valid = columns.date_id != INVALID_DATE_ID
+    opponent = columns.opponent[valid].astype(np.int64)
+    date_ids = columns.date_id[valid].astype(np.int64)
+    values = columns.values[valid][:, [STAT_INDEX[key] for key in PROFILE_STAT_KEYS]].astype(np.float64)
+    attacker_home = columns.home[valid]
+    if len(opponent) == 0:
+        return {}
+
+    stride = int(date_ids.max()) + 1
+    game_keys, inverse = np.unique(opponent * stride + date_ids, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_games = len(game_keys)
+
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    totals = np.stack([
+        np.bincount(inverse, weights=filled[:, i], minlength=n_games) for i in range(len(PROFILE_STAT_KEYS))
+    ], axis=1)
+    has_stat = np.stack([
+        np.bincount(inverse, weights=present[:, i], minlength=n_games) > 0 for i in range(len(PROFILE_STAT_KEYS))
+    ], axis=1)
+    # La defensa juega en casa cuando la mayoría de las líneas rivales son de visitante
+    lines_per_game = np.bincount(inverse, minlength=n_games)
+    defense_home = np.bincount(inverse, weights=attacker_home, minlength=n_games) * 2 < lines_per_game
+
+    game_opponent = game_keys // stride
+    game_date = game_keys % stride
+    boundaries = np.searchsorted(game_opponent, np.arange(len(columns.teams) + 1))
+
+    profiles = {}
+    for code, team_name in enumerate(columns.teams):
+        start, end = boundaries[code], boundaries[code + 1]
+        if start == end:
+            continue
+        # Partidos de la defensa del más reciente al más antiguo
+        games = np.arange(end - 1, start - 1, -1)
+        profile = {
+            "last_game": format_date(int(game_date[games[0]])),
+            **_block(totals[games], has_stat[games]),
+        }
+        for window in RECENT_WINDOWS:
+            recent = games[:window]
+            profile[f"last_{window}"] = _block(totals[recent], has_stat[recent])
+        for venue, mask in (("home", defense_home[games]), ("away", ~defense_home[games])):
+            profile[venue] = _block(totals[games[mask]], has_stat[games[mask]])
+        profiles[team_name] = profile
+    return profiles
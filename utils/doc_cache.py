@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+
+from utils.json_provider import json_backend
+from utils.storage_json import read_bytes
+
+# Presupuesto de la caché de documentos, medido en bytes del JSON ya descomprimido
+# (los objetos parseados ocupan en memoria varias veces ese tamaño)
+DOC_CACHE_MAX_BYTES = int(os.environ.get("DOC_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+
+class DocumentCache:
+    """
+    Caché en memoria de documentos JSON ya parseados, indexada por ruta.
+
+    Una entrada es válida mientras la fecha de modificación y el tamaño del archivo
+    no cambien. Cada documento cuenta por la longitud de su JSON descomprimido (no por
+    el tamaño en disco, que con gzip o zstd es mucho menor); cuando la suma supera
+    `max_bytes` se expulsan los documentos usados hace más tiempo (LRU). Los documentos devueltos se comparten
+    entre peticiones y no deben modificarse.
+    """
+
+    def __init__(self, max_bytes=DOC_CACHE_MAX_BYTES, reader=read_bytes, parse=json_backend.loads):
+        self.max_bytes = max_bytes
+        self.reader = reader
+        self.parse = parse
+        self._entries = OrderedDict()  # ruta -> (versión, tamaño, documento)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version(path):
+        """Versión del archivo (mtime en ns, tamaño). Lanza FileNotFoundError si no existe."""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path):
+        """Devuelve el documento de `path`, cargándolo solo si cambió en disco."""
+        version = self.version(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(path)
+                return entry[2]
+
+        data = self.reader(path)
+        document = self.parse(data)
+
+        with self._lock:
+            self._discard(path)
+            size = len(data)
+            if size <= self.max_bytes:
+                self._entries[path] = (version, size, document)
+                self._total_bytes += size
+                while self._total_bytes > self.max_bytes:
+                    oldest = next(iter(self._entries))
+                    self._discard(oldest)
+        return document
+
+    def invalidate(self, path):
+        """Elimina la entrada de `path` (por ejemplo, tras reescribir el archivo)."""
+        with self._lock:
+            self._discard(path)
+
+    def _discard(self, path):
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._total_bytes -= entry[1]
@@ -0,0 +1,120 @@
+"""
+Métricas de forma por jugador: medias y medianas móviles de los últimos partidos y
+medias exponenciales (EWMA) de cada estadística, combinadas incluidas.
+
+El estado se actualiza de forma incremental con cada partido nuevo (en orden
+cronológico): la suma de cada ventana y cada EWMA se actualizan en O(1) y solo se
+conservan los últimos max(FORM_WINDOWS) valores de cada estadística. Se guarda en el
+documento del equipo ("form") y las métricas se obtienen con form_metrics().
+"""
+from utils.columnar import STAT_KEYS
+from utils.dates import parse_date
+
+# Ventanas de partidos para medias y medianas móviles
+FORM_WINDOWS = (5, 10)
+
+# Spans de las EWMA (alpha = 2 / (span + 1))
+FORM_EWMA_SPANS = (5, 10)
+
+_BUFFER_SIZE = max(FORM_WINDOWS)
+
+
+def _new_state():
+    return {"latest_date": None, "games": 0, "stats": {}}
+
+
+def _new_stat_state():
+    return {
+        "recent": [],
+        "sums": {str(window): 0.0 for window in FORM_WINDOWS},
+        "ewma": {str(span): None for span in FORM_EWMA_SPANS},
+        "count": 0,
+    }
+
+
+def _push(stat_state, value):
+    """Añade un valor: O(1) por ventana y por EWMA."""
+    recent = stat_state["recent"]
+    for window in FORM_WINDOWS:
+        key = str(window)
+        stat_state["sums"][key] += value
+        if len(recent) >= window:
+            stat_state["sums"][key] -= recent[-window]
+    recent.append(value)
+    if len(recent) > _BUFFER_SIZE:
+        del recent[0]
+
+    for span in FORM_EWMA_SPANS:
+        key = str(span)
+        previous = stat_state["ewma"][key]
+        alpha = 2 / (span + 1)
+        stat_state["ewma"][key] = value if previous is None else alpha * value + (1 - alpha) * previous
+    stat_state["count"] += 1
+
+
+def update_player_form(state, new_games):
+    """
+    Aplica los partidos nuevos (posteriores al último conocido) al estado de forma de un
+    jugador, en orden cronológico. Devuelve un estado nuevo; el anterior no se modifica.
+    """
+    state = _copy_state(state) if state else _new_state()
+    latest = parse_date(state["latest_date"]) if state["latest_date"] else None
+
+    dated = [(parse_date(game.get("date")), i, game) for i, game in enumerate(new_games)]
+    dated = sorted((entry for entry in dated if entry[0] is not None), key=lambda entry: entry[:2])
+    for game_date, _, game in dated:
+        if latest is not None and game_date <= latest:
+            continue
+        for key in STAT_KEYS:
+            value = game.get(key)
+            if isinstance(value, (int, float)):
+                _push(state["stats"].setdefault(key, _new_stat_state()), float(value))
+        state["games"] += 1
+        latest = game_date
+        state["latest_date"] = game["date"]
+    return state
+
+
+def _copy_state(state):
+    return {
+        "latest_date": state["latest_date"],
+        "games": state["games"],
+        "stats": {
+            key: {
+                "recent": list(stat_state["recent"]),
+                "sums": dict(stat_state["sums"]),
+                "ewma": dict(stat_state["ewma"]),
+                "count": stat_state["count"],
+            }
+            for key, stat_state in state["stats"].items()
+        },
+    }
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def form_metrics(state):
+    """Métricas de forma a partir del estado: mean_N, median_N y ewma_N por estadística."""
+    if not state:
+        return {"latest_date": None, "games": 0, "stats": {}}
+    stats = {}
+    for key, stat_state in state["stats"].items():
+        recent = stat_state["recent"]
+        metrics = {}
+        for window in FORM_WINDOWS:
+            size = min(window, len(recent))
+            if size:
+                metrics[f"mean_{window}"] = round(stat_state["sums"][str(window)] / size, 2)
+                metrics[f"median_{window}"] = round(_median(recent[-size:]), 2)
+        for span in FORM_EWMA_SPANS:
+            value = stat_state["ewma"][str(span)]
+            if value is not None:
+                metrics[f"ewma_{span}"] = round(value, 2)
+        stats[key] = metrics
+    return {"latest_date": state["latest_date"], "games": state["games"], "stats": stats}
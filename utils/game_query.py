@@ -0,0 +1,291 @@
+"""
+Consultas sobre listas de partidos: filtros (oponente, local/visitante, jugador, equipo,
+rango de fechas), últimos N, proyección de estadísticas y paginación por cursor.
+
+Cada lista se indexa una vez por versión de los datos (GameQueryIndex): los partidos
+se ordenan del más reciente al más antiguo y cada valor de filtro guarda sus posiciones
+(listas de posiciones ordenadas), de modo que una consulta es una intersección de
+listas y dos búsquedas binarias por fecha, sin recorrer los partidos.
+"""
+import base64
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from utils.dates import date_ids_array, date_id_range, date_bound_id
+
+# Campos por los que se puede filtrar
+FILTER_KEYS = ("opponent", "home_or_away", "player", "team")
+
+# Campos que se conservan siempre al proyectar con `fields`
+IDENTITY_KEYS = ("date", "opponent", "home_or_away", "player", "team")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Índices en memoria (uno por lista de partidos y versión de los datos)
+QUERY_INDEX_ENTRIES = 128
+
+
+class GameQuery:
+    """Parámetros de consulta ya validados."""
+
+    PARAMS = ("opponent", "home_or_away", "player", "team", "from", "to", "last_n", "fields", "cursor", "limit")
+
+    def __init__(self, filters=None, date_from=None, date_to=None, last_n=None, fields=None,
+                 offset=0, limit=None, cursor_version=None):
+        self.filters = filters or {}
+        self.date_from = date_from
+        self.date_to = date_to
+        self.last_n = last_n
+        self.fields = fields
+        self.offset = offset
+        self.limit = limit
+        self.cursor_version = cursor_version
+
+    @classmethod
+    def from_args(cls, args):
+        """Construye la consulta a partir de request.args. Lanza ValueError si algún valor no es válido."""
+        filters = {key: args[key] for key in FILTER_KEYS if args.get(key)}
+        if filters.get("home_or_away") not in (None, "home", "away"):
+            raise ValueError("home_or_away debe ser 'home' o 'away'")
+
+        date_from = _date_bound(args.get("from"), "from")
+        date_to = _date_bound(args.get("to"), "to")
+        last_n = _positive_int(args.get("last_n"), "last_n")
+        limit = _positive_int(args.get("limit"), "limit")
+        if limit is not None:
+            limit = min(limit, MAX_PAGE_SIZE)
+
+        fields = None
+        if args.get("fields"):
+            fields = {field.strip() for field in args["fields"].split(",") if field.strip()}
+
+        offset, cursor_version = 0, None
+        if args.get("cursor"):
+            offset, cursor_version = decode_cursor(args["cursor"])
+            limit = limit or DEFAULT_PAGE_SIZE
+
+        return cls(filters, date_from, date_to, last_n, fields, offset, limit, cursor_version)
+
+    @staticmethod
+    def requested(args):
+        """Indica si la petición trae algún parámetro de consulta."""
+        return any(key in args for key in GameQuery.PARAMS)
+
+    def without(self, *keys):
+        """Copia de la consulta sin los filtros indicados."""
+        filters = {key: value for key, value in self.filters.items() if key not in keys}
+        return GameQuery(filters, self.date_from, self.date_to, self.last_n, self.fields,
+                         self.offset, self.limit, self.cursor_version)
+
+
+def _positive_int(value, name):
+    if value in (None, ""):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} debe ser un entero") from None
+    if number < 1:
+        raise ValueError(f"{name} debe ser mayor que cero")
+    return number
+
+
+def _date_bound(value, name):
+    if value in (None, ""):
+        return None
+    if date_bound_id(value) is None:
+        raise ValueError(f"{name} debe ser una fecha (2024-01-01 o '1 ene 2024')")
+    return value
+
+
+def encode_cursor(offset, version):
+    return base64.urlsafe_b64encode(f"{offset}:{version}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        offset, version = raw.split(":", 1)
+        return int(offset), version
+    except ValueError:
+        raise ValueError("cursor no válido") from None
+
+
+def project(game, fields):
+    """Partido con solo los campos de identidad y las estadísticas de `fields`."""
+    if fields is None:
+        return game
+    return {key: value for key, value in game.items() if key in fields or key in IDENTITY_KEYS}
+
+
+class GameQueryIndex:
+    """
+    Índice de una lista de partidos. `extra` permite añadir valores de filtro que no
+    están en los propios partidos (p. ej. el jugador de cada partido de un equipo).
+    """
+
+    def __init__(self, games, extra=None, version=None):
+        self.games = games
+        self.version = version
+        ids = date_ids_array([game.get("date") for game in games])
+        # Del más reciente al más antiguo; a igual fecha se conserva el orden original
+        self.order = np.argsort(-ids.astype(np.int64), kind="stable")
+        self._neg_ids = -ids[self.order].astype(np.int64)
+
+        postings = {key: defaultdict(list) for key in FILTER_KEYS}
+        for position, index in enumerate(self.order.tolist()):
+            game = games[index]
+            for key in FILTER_KEYS:
+                value = extra[key][index] if extra and key in extra else game.get(key)
+                if value is not None:
+                    postings[key][value].append(position)
+        self.postings = {
+            key: {value: np.array(positions, dtype=np.int64) for value, positions in values.items()}
+            for key, values in postings.items()
+        }
+
+    @classmethod
+    def from_columns(cls, columns, team_name, version=None):
+        """
+        Índice de los partidos de un equipo a partir de sus columnas (ColumnStore.team),
+        sin documentos: sirve para positions() pero no para select() ni page().
+        """
+        index = cls.__new__(cls)
+        index.games = None
+        index.version = version
+        ids = columns.date_id.astype(np.int64)
+        index.order = np.argsort(-ids, kind="stable")
+        index._neg_ids = -ids[index.order]
+
+        # Cada valor de filtro agrupa sus posiciones (ya ordenadas) con un argsort estable
+        codes = {
+            "opponent": (columns.opponent[index.order], columns.teams),
+            "home_or_away": (columns.home[index.order].astype(np.int8), ["away", "home"]),
+            "player": (columns.player[index.order], columns.players),
+        }
+        index.postings = {key: {} for key in FILTER_KEYS}
+        for key, (values, names) in codes.items():
+            if not len(values):
+                continue
+            by_code = np.argsort(values, kind="stable")
+            bounds = np.flatnonzero(np.diff(values[by_code])) + 1
+            for group in np.split(by_code, bounds):
+                index.postings[key][names[values[group[0]]]] = group.astype(np.int64)
+        if len(ids):
+            index.postings["team"][team_name] = np.arange(len(ids), dtype=np.int64)
+        return index
+
+    def positions(self, query):
+        """Posiciones (en orden del más reciente al más antiguo) que cumplen la consulta."""
+        # Sin rango de fechas se incluyen también los partidos con fecha no válida; con
+        # cualquier extremo quedan fuera (están al final del orden)
+        if query.date_from or query.date_to:
+            low, high = date_id_range(query.date_from, query.date_to)
+            start = np.searchsorted(self._neg_ids, -high, side="left")
+            end = np.searchsorted(self._neg_ids, -low, side="right")
+        else:
+            start, end = 0, len(self._neg_ids)
+
+        selected = None
+        for key, value in query.filters.items():
+            posting = self.postings.get(key, {}).get(value)
+            if posting is None:
+                return np.empty(0, dtype=np.int64)
+            selected = posting if selected is None else np.intersect1d(selected, posting, assume_unique=True)
+
+        if selected is None:
+            selected = np.arange(start, end, dtype=np.int64)
+        else:
+            selected = selected[np.searchsorted(selected, start):np.searchsorted(selected, end)]
+
+        if query.last_n is not None:
+            selected = selected[:query.last_n]
+        return selected
+
+    def select(self, query):
+        """Partidos de la consulta (proyectados) como lista, sin paginar."""
+        indices = self.order[self.positions(query)].tolist()
+        return [project(self.games[index], query.fields) for index in indices]
+
+    def page(self, query):
+        """
+        Partidos de la consulta paginados: devuelve (partidos, total, siguiente cursor).
+        Lanza ValueError si el cursor pertenece a otra versión de los datos.
+        """
+        if query.cursor_version is not None and query.cursor_version != self.version:
+            raise ValueError("cursor caducado: los datos han cambiado")
+        positions = self.positions(query)
+        total = len(positions)
+        end = total if query.limit is None else min(query.offset + query.limit, total)
+        indices = self.order[positions[query.offset:end]].tolist()
+        next_cursor = encode_cursor(end, self.version) if end < total else None
+        return [project(self.games[index], query.fields) for index in indices], total, next_cursor
+
+
+def team_query_index(team_data, version=None):
+    """Índice de todos los partidos de un equipo, con el jugador como filtro."""
+    games, player_of = [], []
+    for player_name, player_games in team_data.get("players", {}).items():
+        games.extend(player_games)
+        player_of.extend([player_name] * len(player_games))
+    team_of = [team_data.get("team_name")] * len(games)
+    return GameQueryIndex(games, extra={"player": player_of, "team": team_of}, version=version)
+
+
+def team_query_response(index, team_data, query):
+    """
+    Respuesta filtrada de un equipo: los filtros y last_n se aplican a cada jugador y la
+    paginación por cursor recorre la plantilla (limit = jugadores por página).
+    """
+    if query.cursor_version is not None and query.cursor_version != index.version:
+        raise ValueError("cursor caducado: los datos han cambiado")
+    roster = list(team_data.get("players", {}))
+    if "player" in query.filters:
+        roster = [name for name in roster if name == query.filters["player"]]
+
+    end = len(roster) if query.limit is None else min(query.offset + query.limit, len(roster))
+    players = {}
+    for player_name in roster[query.offset:end]:
+        player_query = query.without("player")
+        player_query.filters["player"] = player_name
+        players[player_name] = index.select(player_query)
+
+    return {
+        "team_name": team_data.get("team_name"),
+        "players": players,
+        "count": len(roster),
+        "next_cursor": encode_cursor(end, index.version) if end < len(roster) else None,
+    }
+
+
+class QueryIndexCache:
+    """
+    Caché LRU por clave de índices (o resultados) que dependen de una versión de los
+    datos; `build(version)` solo se llama si la entrada no existe o su versión cambió.
+    """
+
+    def __init__(self, max_entries=QUERY_INDEX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # clave -> (versión, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = build(version)
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+query_indexes = QueryIndexCache()
@@ -0,0 +1,148 @@
+"""
+Porcentaje de partidos en que un jugador supera una línea (prop) de una estadística.
+
+El índice de un equipo guarda la matriz de estadísticas (GameColumns, leída del almacén
+.npz cuando está al día), el índice de consultas de sus partidos (GameQueryIndex, del
+más reciente al más antiguo) y, por jugador y estadística, los valores ya ordenados.
+Los aciertos para varias líneas se obtienen con una búsqueda binaria por línea sobre
+el array ordenado.
+"""
+import numpy as np
+
+from utils.columnar import GameColumns, STAT_KEYS, STAT_INDEX
+from utils.game_query import GameQuery, GameQueryIndex, team_query_index
+
+PERCENTILES = (10, 25, 50, 75, 90)
+_PERCENTILE_FRACTIONS = np.array(PERCENTILES, dtype=np.float64) / 100
+
+
+def parse_lines(value):
+    """Convierte "20.5,25.5" en un array de líneas. Lanza ValueError si no son números."""
+    try:
+        lines = [float(line) for line in value.split(",") if line.strip()]
+    except ValueError:
+        raise ValueError("lines debe ser una lista de números separados por comas") from None
+    if not lines:
+        raise ValueError("Se necesita al menos una línea (lines)")
+    return np.array(lines, dtype=np.float64)
+
+
+def parse_stats(value):
+    """Lista de estadísticas pedidas (separadas por comas). Lanza ValueError si alguna no existe."""
+    stats = [stat.strip() for stat in (value or "").split(",") if stat.strip()]
+    if not stats:
+        raise ValueError("Se necesita una estadística (stat)")
+    unknown = [stat for stat in stats if stat not in STAT_INDEX]
+    if unknown:
+        raise ValueError(f"Estadística no válida: {', '.join(unknown)}. Opciones: {', '.join(STAT_KEYS)}")
+    return stats
+
+
+def _percentiles(ordered):
+    """Percentiles con interpolación lineal (como np.percentile) sobre valores ya ordenados."""
+    n_games = len(ordered)
+    if not n_games:
+        return {}
+    values = np.interp(_PERCENTILE_FRACTIONS * (n_games - 1), np.arange(n_games), ordered)
+    return {f"p{p}": round(value, 2) for p, value in zip(PERCENTILES, values.tolist())}
+
+
+def _streaks(over):
+    """Racha actual (desde el partido más reciente) y racha más larga por línea."""
+    n_lines, n_games = over.shape
+    if n_games == 0:
+        return [0] * n_lines, [0] * n_lines
+    misses = ~over
+    current = np.where(misses.any(axis=1), misses.argmax(axis=1), n_games)
+
+    longest = []
+    for row in over:
+        # Longitud de cada tramo de aciertos consecutivos
+        padded = np.concatenate(([0], row.astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(padded))
+        longest.append(int((edges[1::2] - edges[::2]).max(initial=0)))
+    return current.tolist(), longest
+
+
+class HitRateIndex:
+    """
+    Índice de aciertos de los jugadores de un equipo. Se construye desde el almacén
+    columnar (from_columns) o, si el equipo no está al día en él, desde su documento
+    (from_team_data); en ambos casos las filas de `columns` son las del índice de consultas.
+    """
+
+    def __init__(self, roster, query_index, columns, version=None):
+        self.version = version
+        self.roster = list(roster)
+        self.query_index = query_index
+        self.columns = columns
+        self._rows_by_player = {}
+        self._sorted = {}
+
+    @classmethod
+    def from_team_data(cls, team_data, version=None):
+        """Índice a partir del documento del equipo."""
+        players = team_data.get("players", {})
+        return cls(players, team_query_index(team_data), GameColumns.from_player_stats(players), version)
+
+    @classmethod
+    def from_columns(cls, roster, columns, team_name, version=None):
+        """`roster` y `columns` son los de ColumnStore.team()."""
+        return cls(roster, GameQueryIndex.from_columns(columns, team_name), columns, version)
+
+    def player_rows(self, player_name, query=None):
+        """Filas del jugador (del partido más reciente al más antiguo) que cumplen la consulta."""
+        if query is None or not (query.filters or query.last_n or query.date_from or query.date_to):
+            rows = self._rows_by_player.get(player_name)
+            if rows is None:
+                rows = self._rows_by_player[player_name] = self._select(player_name, query)
+            return rows, True
+        return self._select(player_name, query), False
+
+    def _select(self, player_name, query):
+        player_query = (query or GameQuery()).without("player")
+        player_query.filters["player"] = player_name
+        return self.query_index.order[self.query_index.positions(player_query)]
+
+    def sorted_values(self, player_name, stat, rows):
+        """Valores ordenados (sin NaN) de una estadística en todos los partidos del jugador (se ordenan una vez)."""
+        key = (player_name, stat)
+        values = self._sorted.get(key)
+        if values is None:
+            values = self._sorted[key] = np.sort(self._values(rows, stat))
+        return values
+
+    def _values(self, rows, stat):
+        values = self.columns.values[rows, STAT_INDEX[stat]].astype(np.float64)
+        return values[~np.isnan(values)]
+
+    def evaluate(self, player_name, stat, lines, query):
+        """Aciertos, porcentaje y rachas para cada línea, y percentiles de la estadística."""
+        rows, full = self.player_rows(player_name, query)
+        recent_first = self._values(rows, stat)
+        ordered = self.sorted_values(player_name, stat, rows) if full else np.sort(recent_first)
+        n_games = len(ordered)
+
+        hits = n_games - np.searchsorted(ordered, lines, side="right")
+        current, longest = _streaks(recent_first[None, :] > lines[:, None])
+        result = {
+            "games": n_games,
+            "mean": round(float(ordered.mean()), 2) if n_games else None,
+            "percentiles": _percentiles(ordered),
+            "lines": {},
+        }
+        for i, line in enumerate(lines.tolist()):
+            result["lines"][f"{line:g}"] = {
+                "hits": int(hits[i]),
+                "hit_rate": round(float(hits[i]) / n_games, 4) if n_games else None,
+                "current_streak": int(current[i]),
+                "longest_streak": int(longest[i]),
+            }
+        return result
+
+    def evaluate_roster(self, players, stats, lines, query):
+        """Resultados jugador x estadística x línea."""
+        return {
+            player_name: {stat: self.evaluate(player_name, stat, lines, query) for stat in stats}
+            for player_name in players
+        }
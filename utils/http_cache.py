@@ -0,0 +1,164 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+
+from utils.http_client import fetch
+from utils.instrumentation import PageStats
+
+# Caché HTTP en disco (configurable por variables de entorno)
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "http_cache")
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE_ENABLED", "1") != "0"
+
+
+class HTTPCache:
+    """
+    Caché de respuestas HTTP en disco, indexada por URL.
+
+    Cada entrada es un archivo gzip con el cuerpo, los validadores (ETag y
+    Last-Modified) y, opcionalmente, el resultado ya parseado de la página.
+    La fecha de modificación del archivo se usa como marca de último acceso
+    para la expulsión LRU cuando se supera el tamaño máximo.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _path(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.cache")
+
+    def get(self, url):
+        """Devuelve la entrada de la URL o None si no existe o está corrupta."""
+        path = self._path(url)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Entrada de caché corrupta para {url}: {e}")
+            return None
+        return entry if entry.get("url") == url else None
+
+    def touch(self, url):
+        """Marca la entrada como usada recientemente."""
+        try:
+            os.utime(self._path(url))
+        except FileNotFoundError:
+            pass
+
+    def put(self, url, entry):
+        """Guarda la entrada de forma atómica y aplica el límite de tamaño."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump(dict(entry, url=url), file, separators=(",", ":"), ensure_ascii=False)
+
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += os.path.getsize(path) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".cache"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta quedar por debajo del límite."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total_bytes = total
+
+
+http_cache = HTTPCache()
+
+
+def fetch_parsed(url, parse, parser_key, reusable=None, page_stats=None):
+    """
+    Descarga una URL con GET condicional y devuelve (status_code, resultado parseado).
+
+    Si el servidor responde 304 se reutiliza el resultado parseado guardado sin
+    volver a procesar el HTML. `parser_key` identifica al parser (y su versión)
+    para no reutilizar resultados de un parser distinto; `reusable` permite
+    aceptar además otras claves guardadas. Si la respuesta no es 200 ni 304 el
+    resultado es None. Si se pasa `page_stats` (PageStats) se anotan en él el
+    estado, los bytes descargados y el tiempo de parseo.
+    """
+    reusable = reusable or (lambda stored_key: stored_key == parser_key)
+    page_stats = page_stats or PageStats(url)
+
+    if not HTTP_CACHE_ENABLED:
+        response = fetch(url)
+        page_stats.status = response.status_code
+        page_stats.bytes = len(response.content)
+        if response.status_code != 200:
+            return response.status_code, None
+        return 200, page_stats.timed(parse, response.text)
+
+    entry = http_cache.get(url)
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = fetch(url, headers=headers or None)
+    page_stats.status = response.status_code
+    page_stats.bytes = len(response.content)
+
+    if response.status_code == 304 and entry:
+        page_stats.not_modified = True
+        if reusable(entry.get("parser")):
+            http_cache.touch(url)
+            return 200, entry["parsed"]
+        # El parser ha cambiado: se reutiliza el cuerpo guardado
+        parsed = page_stats.timed(parse, entry["body"])
+        http_cache.put(url, dict(entry, parser=parser_key, parsed=parsed))
+        return 200, parsed
+
+    if response.status_code != 200:
+        return response.status_code, None
+
+    parsed = page_stats.timed(parse, response.text)
+    if response.headers.get("ETag") or response.headers.get("Last-Modified"):
+        http_cache.put(url, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": response.text,
+            "parser": parser_key,
+            "parsed": parsed,
+        })
+    return 200, parsed
@@ -0,0 +1,117 @@
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Concurrencia del scraping (configurable por variables de entorno)
+PLAYER_WORKERS = int(os.environ.get("SCRAPER_PLAYER_WORKERS", "16"))  # Páginas de jugador en paralelo
+HOST_CONCURRENCY = int(os.environ.get("SCRAPER_HOST_CONCURRENCY", "16"))  # Peticiones simultáneas por host
+
+# Tiempos de espera en segundos: (conexión, lectura)
+CONNECT_TIMEOUT = float(os.environ.get("SCRAPER_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("SCRAPER_READ_TIMEOUT", "20"))
+
+# Reintentos con backoff exponencial y jitter
+MAX_RETRIES = int(os.environ.get("SCRAPER_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.environ.get("SCRAPER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("SCRAPER_BACKOFF_MAX", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+USER_AGENT = "Mozilla/5.0 (compatible; back-scraper/1.0)"
+
+_session = None
+_session_lock = threading.Lock()
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Devuelve la sesión HTTP compartida, con un pool de conexiones keep-alive
+    dimensionado para la concurrencia del refresco.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=max(PLAYER_WORKERS, HOST_CONCURRENCY),
+                pool_block=True,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            _session = session
+    return _session
+
+
+def _host_semaphore(url):
+    """Devuelve el semáforo que limita las peticiones simultáneas al host de la URL."""
+    host = urlparse(url).netloc
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(HOST_CONCURRENCY)
+            _host_semaphores[host] = semaphore
+    return semaphore
+
+
+def _retry_after_seconds(response):
+    """Interpreta la cabecera Retry-After (segundos o fecha HTTP). Devuelve None si no es válida."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def _backoff_seconds(attempt):
+    """Backoff exponencial con jitter completo."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def fetch(url, headers=None):
+    """
+    Descarga una URL con la sesión compartida, respetando el límite por host,
+    con timeouts explícitos y reintentos ante 429/5xx o errores de conexión.
+
+    Devuelve la última respuesta obtenida; si todos los intentos fallan por
+    errores de red, relanza la última excepción.
+    """
+    session = get_session()
+    semaphore = _host_semaphore(url)
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with semaphore:
+                response = session.get(url, headers=headers, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = _backoff_seconds(attempt)
+            logging.warning(f"Error de red en {url} ({e}); reintento {attempt + 1} en {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+
+        retry_after = _retry_after_seconds(response)
+        delay = min(BACKOFF_MAX, retry_after) if retry_after is not None else _backoff_seconds(attempt)
+        logging.warning(f"Estado {response.status_code} en {url}; reintento {attempt + 1} en {delay:.2f}s")
+        response.close()
+        time.sleep(delay)
@@ -0,0 +1,83 @@
+import os
+import hashlib
+import datetime
+from functools import wraps
+
+from flask import request, make_response
+
+# Segundos que el navegador puede reutilizar una respuesta sin revalidarla
+HTTP_MAX_AGE = int(os.environ.get("HTTP_MAX_AGE", "60"))
+
+
+def file_versions(paths):
+    """(mtime_ns, tamaño) de cada archivo existente; None si no existe ninguno."""
+    versions = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        versions.append((path, stat.st_mtime_ns, stat.st_size))
+    return versions or None
+
+
+def data_version(paths):
+    """Identificador corto de la versión de los archivos de datos (para cachés e índices)."""
+    return hashlib.sha1(repr(file_versions(paths)).encode("utf-8")).hexdigest()[:12]
+
+
+def validators(versions):
+    """ETag (débil, incluye ruta y query string) y fecha de última modificación."""
+    digest = hashlib.sha1(repr((versions, request.path, request.query_string)).encode("utf-8")).hexdigest()[:20]
+    last_modified = datetime.datetime.fromtimestamp(
+        max(mtime for _, mtime, _ in versions) / 1e9, tz=datetime.timezone.utc
+    ).replace(microsecond=0)
+    return digest, last_modified
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _fresh_today(versions):
+    newest = max(mtime for _, mtime, _ in versions) / 1e9
+    return datetime.date.fromtimestamp(newest) >= datetime.date.today()
+
+
+def cache_validated(paths_for, fresh_only=False):
+    """
+    Decorador de endpoints GET: calcula ETag y Last-Modified a partir de la versión
+    (mtime, tamaño) de los archivos de datos que devuelve `paths_for(**kwargs)` y
+    responde 304 antes de ejecutar la vista, sin leer ni parsear ningún archivo.
+    Con `fresh_only` solo se responde 304 si los archivos se escribieron hoy, para que
+    los datos desactualizados sigan pasando por la vista (que los actualiza).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = file_versions(paths_for(**kwargs))
+            if versions is None:
+                return view(*args, **kwargs)
+
+            etag, last_modified = validators(versions)
+            if _not_modified(etag, last_modified) and (not fresh_only or _fresh_today(versions)):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # La vista pudo reescribir los datos (scraping): validadores de la versión final
+                versions = file_versions(paths_for(**kwargs)) or versions
+                etag, last_modified = validators(versions)
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.cache_control.public = True
+            response.cache_control.max_age = HTTP_MAX_AGE
+            return response
+        return wrapper
+    return decorator
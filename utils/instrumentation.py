@@ -0,0 +1,99 @@
+import time
+import logging
+import threading
+from collections import Counter
+
+# Logger de instrumentación del scraping; a nivel DEBUG emite una línea por página
+page_logger = logging.getLogger("scraper.pages")
+
+
+class PageCounter:
+    """
+    Totales del proceso (páginas, respuestas 304, bytes y páginas parseadas con el
+    parser de referencia por tener celdas sin cerrar), seguros entre hilos.
+    Sirven para medir el progreso de un refresco comparando dos snapshot().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.parser_fallbacks = 0
+
+    def record(self, page_stats):
+        with self._lock:
+            self.pages += 1
+            self.not_modified += int(page_stats.not_modified)
+            self.bytes += page_stats.bytes
+            self.parser_fallbacks += page_stats.parser_fallbacks
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "not_modified": self.not_modified,
+                "bytes": self.bytes,
+                "parser_fallbacks": self.parser_fallbacks,
+            }
+
+
+page_counter = PageCounter()
+
+
+class PageStats:
+    """
+    Contadores de una página scrapeada: estado HTTP, bytes descargados, si vino de la
+    caché (304), tiempo de parseo, veces que se usó el parser de referencia en lugar del
+    rápido, filas vistas, guardadas y descartadas por motivo.
+    Se emiten una sola vez por página con emit().
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.status = None
+        self.bytes = 0
+        self.not_modified = False
+        self.parse_seconds = 0.0
+        self.parser_fallbacks = 0
+        self.rows_seen = 0
+        self.rows_kept = 0
+        self.skipped = Counter()
+
+    def skip(self, reason):
+        """Cuenta una fila descartada por el motivo indicado."""
+        self.skipped[reason] += 1
+
+    def timed(self, func, *args):
+        """Ejecuta func(*args) acumulando su duración como tiempo de parseo."""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.parse_seconds += time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "status": self.status,
+            "bytes": self.bytes,
+            "not_modified": self.not_modified,
+            "parse_ms": round(self.parse_seconds * 1000, 2),
+            "parser_fallbacks": self.parser_fallbacks,
+            "rows_seen": self.rows_seen,
+            "rows_kept": self.rows_kept,
+            "rows_skipped": dict(self.skipped),
+        }
+
+    def emit(self, level=logging.DEBUG):
+        """Registra los contadores de la página si el nivel está habilitado (formateo perezoso)."""
+        page_counter.record(self)
+        if not page_logger.isEnabledFor(level):
+            return
+        page_logger.log(
+            level,
+            "Página %s: estado=%s bytes=%d 304=%s parseo=%.1fms fallback=%d filas=%d guardadas=%d descartadas=%s",
+            self.url, self.status, self.bytes, self.not_modified, self.parse_seconds * 1000, self.parser_fallbacks,
+            self.rows_seen, self.rows_kept, dict(self.skipped),
+            extra={"page_stats": self.as_dict()},
+        )
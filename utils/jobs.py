@@ -0,0 +1,137 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+
+from utils.instrumentation import page_counter
+
+# Número de trabajos terminados que se conservan para consultar su estado
+JOB_HISTORY = 20
+
+
+class RefreshJob:
+    """
+    Estado y progreso de un refresco completo: etapa, equipos terminados, páginas
+    descargadas, errores por equipo y tiempo estimado restante.
+    """
+
+    def __init__(self, teams_total):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"  # queued, running, succeeded, failed
+        self.stage = None
+        self.teams_total = teams_total
+        self.teams_done = 0
+        self.errors = {}
+        self.message = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._pages_start = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+            self._pages_start = page_counter.snapshot()
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+
+    def team_done(self, team_name, error=None):
+        """Callback de refresh_teams al terminar un equipo."""
+        with self._lock:
+            self.teams_done += 1
+            if error:
+                self.errors[team_name] = error
+
+    def finish(self, error=None):
+        with self._lock:
+            self.status = "failed" if error else "succeeded"
+            self.message = error
+            self.stage = None
+            self.finished_at = time.time()
+
+    def eta_seconds(self):
+        """Estimación lineal a partir del ritmo de equipos terminados (None si aún no hay datos)."""
+        if self.status != "running" or not self.teams_done or self.started_at is None:
+            return 0 if self.status in ("succeeded", "failed") else None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.teams_total - self.teams_done, 0)
+        return round(elapsed / self.teams_done * remaining, 1)
+
+    def as_dict(self):
+        with self._lock:
+            pages = {"pages": 0, "not_modified": 0, "bytes": 0, "parser_fallbacks": 0}
+            if self._pages_start is not None:
+                current = page_counter.snapshot()
+                pages = {key: current[key] - self._pages_start[key] for key in current}
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "teams_total": self.teams_total,
+                "teams_done": self.teams_done,
+                "pages_fetched": pages["pages"],
+                "pages_not_modified": pages["not_modified"],
+                "bytes_fetched": pages["bytes"],
+                "parser_fallbacks": pages["parser_fallbacks"],
+                "errors": dict(self.errors),
+                "message": self.message,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "eta_seconds": self.eta_seconds(),
+            }
+
+
+class RefreshScheduler:
+    """
+    Ejecuta los refrescos en un hilo de fondo, uno cada vez (single-flight): si ya hay
+    un refresco en cola o en curso, submit() devuelve ese mismo trabajo.
+    """
+
+    def __init__(self, run, teams_total=0, history=JOB_HISTORY):
+        self._run = run
+        self._teams_total = teams_total
+        self._history = history
+        self._jobs = OrderedDict()
+        self._active = None
+        self._lock = threading.Lock()
+
+    def submit(self):
+        """Devuelve (trabajo, creado): creado es False si se reutiliza el refresco activo."""
+        with self._lock:
+            if self._active is not None:
+                return self._active, False
+            job = RefreshJob(self._teams_total)
+            self._active = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history:
+                self._jobs.popitem(last=False)
+
+        thread = threading.Thread(target=self._execute, args=(job,), name=f"refresh-{job.id[:8]}", daemon=True)
+        thread.start()
+        return job, True
+
+    def _execute(self, job):
+        job.start()
+        try:
+            self._run(job)
+            job.finish()
+        except Exception as e:
+            logging.exception(f"Error en el refresco {job.id}")
+            job.finish(str(e))
+        finally:
+            with self._lock:
+                self._active = None
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self):
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
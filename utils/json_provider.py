@@ -0,0 +1,96 @@
+import os
+import json
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el módulo json estándar
+    orjson = None
+
+# Backend de serialización JSON: "auto", "orjson" o "stdlib"
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+
+
+class StdlibJSON:
+    """Serialización con el módulo json de la librería estándar."""
+
+    name = "stdlib"
+
+    def dumps(self, obj, sort_keys=False, ensure_ascii=True, default=None):
+        """Texto JSON compacto."""
+        return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=ensure_ascii, default=default, separators=(",", ":"))
+
+    def dumps_bytes(self, obj, sort_keys=False, ensure_ascii=True, default=None):
+        return self.dumps(obj, sort_keys, ensure_ascii, default).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonJSON:
+    """
+    Serialización con orjson (en C). Siempre escribe UTF-8 sin escapar los caracteres
+    no ASCII; el resultado es JSON equivalente al de la librería estándar.
+    """
+
+    name = "orjson"
+
+    def dumps_bytes(self, obj, sort_keys=False, ensure_ascii=True, default=None):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if default is not None:
+            # Las fechas pasan por `default`, como en el proveedor de Flask
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+
+    def dumps(self, obj, sort_keys=False, ensure_ascii=True, default=None):
+        return self.dumps_bytes(obj, sort_keys, ensure_ascii, default).decode("utf-8")
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+JSON_BACKENDS = {"stdlib": StdlibJSON()}
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = OrjsonJSON()
+
+
+def get_json_backend(name=None):
+    """Devuelve el backend de serialización configurado (orjson si está disponible)."""
+    name = name or JSON_BACKEND
+    if name == "auto":
+        name = "orjson" if "orjson" in JSON_BACKENDS else "stdlib"
+    if name not in JSON_BACKENDS:
+        logging.warning(f"Backend JSON '{name}' no disponible; se usa stdlib.")
+        name = "stdlib"
+    return JSON_BACKENDS[name]
+
+
+json_backend = get_json_backend()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask que usa el backend configurado. Las respuestas con sangría
+    (modo debug) siguen pasando por la librería estándar.
+    """
+
+    backend = json_backend
+
+    def dumps(self, obj, **kwargs):
+        if "indent" in kwargs or self.backend.name == "stdlib":
+            return super().dumps(obj, **kwargs)
+        return self.backend.dumps(
+            obj,
+            sort_keys=kwargs.get("sort_keys", self.sort_keys),
+            ensure_ascii=kwargs.get("ensure_ascii", self.ensure_ascii),
+            default=kwargs.get("default", self.default),
+        )
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self.backend.loads(s)
@@ -0,0 +1,82 @@
+"""
+Resumen de un enfrentamiento entre dos equipos: forma reciente de cada plantilla y
+estadísticas que permite cada defensa, a partir de los índices ya cargados en memoria.
+"""
+import numpy as np
+
+from utils.columnar import GameColumns, STAT_INDEX
+from utils.game_query import GameQuery
+
+# Estadísticas del resumen (mismas que las medias globales de cada equipo)
+MATCHUP_STAT_KEYS = [
+    "PTS", "REB", "AST", "STL", "BLK", "TO", "2M", "2A", "3M", "3A",
+    "PTS+AST", "REB+AST", "PTS+REB", "PTS+REB+AST",
+]
+
+DEFAULT_LAST_N = 5
+
+
+def _means(values):
+    """Media por columna ignorando NaN, como diccionario redondeado."""
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    sums = np.where(present, values, 0.0).sum(axis=0)
+    return {
+        key: round(float(sums[i] / counts[i]), 2)
+        for i, key in enumerate(MATCHUP_STAT_KEYS) if counts[i]
+    }
+
+
+def recent_form(hit_index, last_n):
+    """Medias de cada jugador en sus últimos `last_n` partidos."""
+    columns = [STAT_INDEX[key] for key in MATCHUP_STAT_KEYS]
+    query = GameQuery(last_n=last_n)
+    players = {}
+    for player_name in hit_index.roster:
+        rows, _ = hit_index.player_rows(player_name, query)
+        values = hit_index.columns.values[rows][:, columns].astype(np.float64)
+        players[player_name] = {"games": len(rows), "recent": _means(values)}
+    return players
+
+
+def allowed_per_game(lines):
+    """
+    Estadísticas que permite una defensa por partido: suma de las líneas de los
+    jugadores rivales dividida por el número de partidos (fechas distintas).
+    """
+    if not lines:
+        return {"games": 0, "per_game": {}}
+    columns = GameColumns.from_player_stats({"lines": lines})
+    values = columns.values[:, [STAT_INDEX[key] for key in MATCHUP_STAT_KEYS]].astype(np.float64)
+    sums = np.nansum(values, axis=0)
+    has_stat = (~np.isnan(values)).any(axis=0)
+    games = len({line.get("date") for line in lines})
+    return {
+        "games": games,
+        "per_game": {
+            key: round(float(sums[i] / games), 2)
+            for i, key in enumerate(MATCHUP_STAT_KEYS) if has_stat[i]
+        },
+    }
+
+
+def team_summary(team_data, hit_index, allowed, last_n):
+    """Bloque de un equipo en el enfrentamiento (`allowed`: perfil defensivo del equipo)."""
+    global_stats = team_data.get("global_stats", {})
+    return {
+        "team_name": team_data.get("team_name"),
+        "season": {key: global_stats[key] for key in MATCHUP_STAT_KEYS if key in global_stats},
+        "players": recent_form(hit_index, last_n),
+        "allowed": allowed,
+    }
+
+
+def build_matchup(local, visitor, last_n=DEFAULT_LAST_N):
+    """
+    `local` y `visitor` son tuplas (documento del equipo, HitRateIndex, perfil defensivo).
+    """
+    return {
+        "last_n": last_n,
+        "local": team_summary(*local, last_n),
+        "visitor": team_summary(*visitor, last_n),
+    }
@@ -0,0 +1,83 @@
+import threading
+
+from utils.doc_cache import DocumentCache
+from utils.storage_json import load_json_file
+from utils.json_provider import json_backend
+from utils.compression import precompress
+from utils.opponent_stats import OUTPUT_FILE
+
+
+def serialize_json(data):
+    """Serializa igual que jsonify (claves ordenadas, formato compacto, mismo backend JSON)."""
+    return json_backend.dumps_bytes(data, sort_keys=True) + b"\n"
+
+
+class OpponentSnapshot:
+    """
+    Estado inmutable del índice: datos por oponente y respuestas ya serializadas.
+    La respuesta completa se precomprime (gzip/brotli) al construir el snapshot.
+    """
+
+    def __init__(self, version, by_opponent):
+        self.version = version
+        self.by_opponent = by_opponent
+        self.bulk_body = serialize_json(by_opponent)
+        self.bulk_encoded = precompress(self.bulk_body)
+        self._team_bodies = {}
+        self._team_encoded = {}
+
+    def team_body(self, team_name):
+        """Respuesta serializada de un equipo (se serializa una vez y se reutiliza)."""
+        body = self._team_bodies.get(team_name)
+        if body is None:
+            body = serialize_json(self.by_opponent[team_name])
+            self._team_bodies[team_name] = body
+        return body
+
+    def team_encoded(self, team_name):
+        """Variantes comprimidas de la respuesta de un equipo (se comprimen una vez)."""
+        variants = self._team_encoded.get(team_name)
+        if variants is None:
+            variants = precompress(self.team_body(team_name))
+            self._team_encoded[team_name] = variants
+        return variants
+
+
+class OpponentIndex:
+    """
+    Índice en memoria de opponent_stats.json, indexado por oponente.
+
+    El archivo se carga una sola vez; se recarga si cambia en disco o al llamar a
+    reload() tras regenerarlo. La recarga construye un snapshot nuevo y lo publica
+    con una única asignación, de modo que los lectores nunca ven un estado a medias.
+    """
+
+    def __init__(self, path=OUTPUT_FILE):
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Devuelve el snapshot vigente. Lanza FileNotFoundError si no hay archivo."""
+        version = DocumentCache.version(self.path)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return self.reload()
+
+    def reload(self):
+        """Vuelve a cargar el archivo y publica el nuevo snapshot de forma atómica."""
+        with self._lock:
+            version = DocumentCache.version(self.path)
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = OpponentSnapshot(version, load_json_file(self.path))
+                self._snapshot = snapshot
+            return snapshot
+
+    def get(self, team_name):
+        """Líneas permitidas por `team_name`, o None si no hay datos para él."""
+        return self.snapshot().by_opponent.get(team_name)
+
+
+opponent_index = OpponentIndex()
@@ -0,0 +1,276 @@
+import os
+import json
+import logging
+
+from utils.dates import date_id as compute_date_id
+from utils.aggregation_pool import map_ordered
+from utils.columnar import GameColumns, opponent_totals
+from utils.doc_cache import DocumentCache
+from utils.storage_json import load_json_file, atomic_text_writer, dump_kwargs
+from utils.json_provider import json_backend
+
+DATA_DIR = "data"
+OUTPUT_FILE = os.path.join(DATA_DIR, "opponent_stats.json")
+UPDATED_OUTPUT_FILE = "opponent_stats_updated.json"
+
+
+def team_files(data_dir=DATA_DIR, team_names=None):
+    """Rutas de los JSON de equipo en orden determinista."""
+    if team_names is not None:
+        return [os.path.join(data_dir, f"{team_name}.json") for team_name in team_names]
+    return [
+        os.path.join(data_dir, file_name)
+        for file_name in sorted(os.listdir(data_dir))
+        if file_name.endswith(".json")
+    ]
+
+
+def load_team_games(team_path):
+    """
+    Lee un archivo de equipo y devuelve (equipo, {jugador: [partidos]}) solo con las
+    listas de partidos válidas, o None si el archivo no existe o no es válido.
+    """
+    try:
+        team_data = load_json_file(team_path)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logging.error(f"Error al cargar {team_path}: {e}")
+        return None
+
+    current_team_name = team_data.get("team_name") if isinstance(team_data, dict) else None
+    if not current_team_name:
+        return None
+
+    players = team_data.get("players", {})
+    if not isinstance(players, dict):
+        logging.warning(f"'players' no es un diccionario en {team_path}.")
+        return None
+
+    valid_players = {}
+    for player_name, games in players.items():
+        if not isinstance(games, list):
+            logging.warning(f"'games' no es una lista para {player_name} en {team_path}.")
+            continue
+        valid_players[player_name] = games
+    return current_team_name, valid_players
+
+
+def iter_team_lines(team_path, team_games=None):
+    """
+    Genera (oponente, (partido, jugador, equipo)) para cada partido de un equipo.
+    `team_games` es el resultado de load_team_games si ya se leyó.
+    """
+    team_games = team_games or load_team_games(team_path)
+    if team_games is None:
+        return
+
+    current_team_name, players = team_games
+    for player_name, games in players.items():
+        for game in games:
+            opponent = game.get("opponent")
+            if not opponent:
+                logging.warning(f"Juego inválido encontrado en {team_path}: {game}")
+                continue
+            yield opponent, (game, player_name, current_team_name)
+
+
+def line_of(entry):
+    """
+    Línea de opponent_stats.json a partir de una entrada compacta del acumulador: el
+    partido (claves y valores, en su orden original) con el jugador y el equipo.
+    """
+    keys, values, player_name, team_name = entry
+    line = dict(zip(keys, values))
+    line["player"] = player_name
+    line["team"] = team_name
+    return line
+
+
+class OpponentAccumulator:
+    """
+    Acumula las líneas por oponente con sus date_id y, de la misma lectura, las columnas
+    de partidos (GameColumns) de cada equipo, junto con su plantilla y la versión del
+    archivo leído (para el almacén columnar). Los totales y medias permitidos por
+    oponente se calculan de forma vectorizada sobre las columnas en finish().
+
+    Cada equipo se acumula por separado (partial) y los parciales se fusionan en el
+    orden de los equipos, tanto en modo secuencial como en paralelo, por lo que ambos
+    producen exactamente el mismo resultado.
+
+    Las líneas no se guardan como diccionarios sino como tuplas (claves, valores,
+    jugador, equipo), con una sola tupla de claves compartida por todos los partidos
+    que tienen los mismos campos; cada línea se reconstruye al escribirla (line_of).
+    """
+
+    def __init__(self, date_id_of=compute_date_id):
+        self.date_id_of = date_id_of
+        self.lines = {}
+        self.line_date_ids = {}
+        self.skipped_dates = set()
+        self.column_parts = []
+        self.columns = None
+        self.allowed = {}
+        self.sources = {}
+        self.rosters = {}
+        self._keys = {}
+
+    def _ensure(self, opponent):
+        if opponent not in self.lines:
+            self.lines[opponent] = []
+            self.line_date_ids[opponent] = []
+
+    def add(self, opponent, entry):
+        """Añade la línea (partido, jugador, equipo) de iter_team_lines."""
+        game, player_name, team_name = entry
+        keys = tuple(game)
+        keys = self._keys.setdefault(keys, keys)
+        self._ensure(opponent)
+        self.lines[opponent].append((keys, tuple(game.values()), player_name, team_name))
+
+        date = game.get("date")
+        date_id = self.date_id_of(date)
+        self.line_date_ids[opponent].append(date_id)
+        if not date_id:
+            self.skipped_dates.add(date)
+
+    def merge(self, other):
+        """Añade el parcial de otro acumulador (de un equipo posterior)."""
+        for opponent, lines in other.lines.items():
+            self._ensure(opponent)
+            self.lines[opponent].extend(lines)
+            self.line_date_ids[opponent].extend(other.line_date_ids[opponent])
+        self.skipped_dates |= other.skipped_dates
+        self.column_parts.extend(other.column_parts)
+        self.sources.update(other.sources)
+        self.rosters.update(other.rosters)
+
+    def finish(self):
+        """Une las columnas de todos los equipos y calcula los totales por oponente."""
+        self.columns = GameColumns.concat(self.column_parts)
+        self.column_parts = []
+        self.allowed = opponent_totals(self.columns)
+        return self
+
+    def release_lines(self):
+        """Libera las líneas una vez escritas; se conservan las columnas y los totales."""
+        self.lines = {}
+        self.line_date_ids = {}
+
+    def opponent_lines(self, opponent):
+        """Líneas de opponent_stats.json para un oponente (se construyen al escribirlas)."""
+        return [line_of(entry) for entry in self.lines[opponent]]
+
+    def __getstate__(self):
+        # La función de date_id y la tabla de claves no se envían entre procesos
+        state = self.__dict__.copy()
+        state["date_id_of"] = None
+        state["_keys"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.date_id_of = compute_date_id
+
+    def updated_entry(self, opponent):
+        """Entrada de opponent_stats_updated.json para un oponente (se construye al escribirla)."""
+        games = []
+        for entry, date_id in zip(self.lines[opponent], self.line_date_ids[opponent]):
+            if date_id:
+                line = line_of(entry)
+                line["date_id"] = date_id
+                games.append(line)
+        allowed = self.allowed.get(opponent, {"total": {}, "average": {}})
+        return {"games": games, "total": allowed["total"], "average": allowed["average"]}
+
+
+def team_partial(team_path):
+    """
+    Acumulado parcial de un equipo (se ejecuta en un proceso del pool si está activo):
+    el archivo se lee una vez para las líneas por oponente y para las columnas.
+    La versión del archivo se toma antes de leerlo, así que nunca es más nueva que
+    los datos acumulados.
+    """
+    partial = OpponentAccumulator()
+    try:
+        version = DocumentCache.version(team_path)
+    except FileNotFoundError:
+        return partial
+    team_games = load_team_games(team_path)
+    if team_games is None:
+        return partial
+    for opponent, entry in iter_team_lines(team_path, team_games):
+        partial.add(opponent, entry)
+    team_name, players = team_games
+    partial.column_parts.append(GameColumns.from_team_documents([{"team_name": team_name, "players": players}]))
+    partial.sources[team_name] = version
+    partial.rosters[team_name] = list(players)
+    return partial
+
+
+def write_json_object_stream(path, items, ensure_ascii=True, compact=None):
+    """
+    Escribe un objeto JSON clave a clave a partir de un iterable de (clave, valor),
+    con el mismo formato que json.dump (compacto o indent=4) pero sin construir el
+    objeto completo. La escritura es atómica.
+    """
+    kwargs = dump_kwargs(compact)
+    indent = "indent" in kwargs
+    with atomic_text_writer(path) as file:
+        first = True
+        for key, value in items:
+            if indent:
+                file.write("{\n    " if first else ",\n    ")
+            else:
+                file.write("{" if first else ",")
+            file.write(json.dumps(key, ensure_ascii=ensure_ascii))
+            if indent:
+                file.write(": ")
+                file.write(json.dumps(value, ensure_ascii=ensure_ascii, **kwargs).replace("\n", "\n    "))
+            else:
+                file.write(":")
+                file.write(json_backend.dumps(value, ensure_ascii=ensure_ascii))
+            first = False
+        if first:
+            file.write("{}")
+        else:
+            file.write("\n}" if indent else "}")
+
+
+def build_opponent_stats(data_dir=DATA_DIR, team_names=None, output_file=OUTPUT_FILE,
+                         updated_output_file=UPDATED_OUTPUT_FILE, workers=None):
+    """
+    Genera opponent_stats.json y opponent_stats_updated.json en una sola pasada.
+
+    Cada archivo de equipo se lee una vez; sus líneas se agrupan por oponente a la vez
+    que se les asigna el date_id y se construyen sus columnas de partidos, sobre las que
+    se calculan los totales y medias (opponent_totals). Las dos salidas se escriben en
+    streaming, sin volver a leer el archivo intermedio.
+    Con `workers` > 1 los equipos se procesan en paralelo en un pool de procesos y los
+    parciales se fusionan en orden, con un resultado idéntico al secuencial.
+    Las líneas se acumulan en forma compacta, se reconstruyen al escribirlas y se
+    liberan tras escribir las salidas. Devuelve el acumulador con las
+    columnas de todos los partidos (`columns`), que se persisten en el almacén columnar
+    y sirven también para los perfiles defensivos.
+    """
+    accumulator = OpponentAccumulator()
+    for partial in map_ordered(team_partial, team_files(data_dir, team_names), workers):
+        accumulator.merge(partial)
+    accumulator.finish()
+
+    for date in sorted(d for d in accumulator.skipped_dates if d is not None):
+        logging.warning(f"Fecha {date} no válida. Se omite en {updated_output_file}.")
+
+    write_json_object_stream(
+        output_file, ((opponent, accumulator.opponent_lines(opponent)) for opponent in accumulator.lines)
+    )
+    logging.info(f"Archivo guardado en {output_file}")
+
+    write_json_object_stream(
+        updated_output_file,
+        ((opponent, accumulator.updated_entry(opponent)) for opponent in accumulator.lines),
+        ensure_ascii=False,
+    )
+    logging.info(f"Archivo actualizado guardado en {updated_output_file}")
+    accumulator.release_lines()
+    return accumulator
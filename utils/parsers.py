@@ -0,0 +1,137 @@
+import os
+import re
+import logging
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # lxml es opcional; sin él se usa el parser de la librería estándar
+    lxml = None
+
+# Backend para la tabla de partidos: "auto", "lxml", "strainer" o "bs4"
+PARSER_BACKEND = os.environ.get("SCRAPER_PARSER", "auto")
+
+# Columnas cuyo valor está dentro de un enlace (oponente y fecha)
+LINK_COLUMNS = (0, 1)
+
+_OPEN_CELL = re.compile(r"<(?:td|tr|th)\b", re.IGNORECASE)
+_CLOSE_CELL = re.compile(r"</(?:td|tr|th)\s*>", re.IGNORECASE)
+_TABLE_TAG = re.compile(r"<table\b[^>]*>", re.IGNORECASE)
+_TABLE_END = re.compile(r"</table\s*>", re.IGNORECASE)
+_CLASS_ATTR = re.compile(r"\bclass\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))", re.IGNORECASE)
+
+
+def _cells_bs4(td_list):
+    cells = []
+    for i, td in enumerate(td_list):
+        link = td.find('a') if i in LINK_COLUMNS else None
+        cells.append(link.text if link else td.text)
+    return cells
+
+
+def _rows_from_soup(stats_table):
+    if not stats_table:
+        return []
+    return [_cells_bs4(row.find_all('td')) for row in stats_table.find_all('tr')[1:]]
+
+
+def game_log_rows_bs4(html, page_stats=None):
+    """
+    Parser de referencia: árbol completo con html.parser.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    return _rows_from_soup(soup.find('table', class_='table'))
+
+
+def _has_table_class(value):
+    # Durante el filtrado la clase puede llegar sin separar ("table stats")
+    if not value:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return 'table' in classes
+
+
+def _stats_table_html(html):
+    """Fragmento de la primera tabla con clase "table" (hasta su </table>), o None."""
+    for match in _TABLE_TAG.finditer(html):
+        class_attr = _CLASS_ATTR.search(match.group(0))
+        if class_attr and _has_table_class(next(value for value in class_attr.groups() if value is not None)):
+            end = _TABLE_END.search(html, match.end())
+            return html[match.start():end.end() if end else len(html)]
+    return None
+
+
+def _cells_closed(html):
+    """
+    Indica si todas las celdas y filas de la tabla de partidos están cerradas.
+    html.parser no cierra <td>/<tr> implícitamente y lxml sí, así que con etiquetas sin
+    cerrar en esa tabla los backends rápidos delegan en el de referencia para dar el
+    mismo resultado. El resto de la página (menús, scripts) no se tiene en cuenta.
+    """
+    table = _stats_table_html(html)
+    if table is None:
+        return True
+    return len(_OPEN_CELL.findall(table)) == len(_CLOSE_CELL.findall(table))
+
+
+def _fallback(html, page_stats):
+    if page_stats is not None:
+        page_stats.parser_fallbacks += 1
+    return game_log_rows_bs4(html)
+
+
+def game_log_rows_strainer(html, page_stats=None):
+    """
+    Parseo parcial con SoupStrainer: solo se construye el árbol de las tablas con clase "table".
+    """
+    if html and not _cells_closed(html):
+        return _fallback(html, page_stats)
+    strainer = SoupStrainer('table', class_=_has_table_class)
+    soup = BeautifulSoup(html, 'lxml' if lxml else 'html.parser', parse_only=strainer)
+    return _rows_from_soup(soup.find('table', class_='table'))
+
+
+def game_log_rows_lxml(html, page_stats=None):
+    """
+    Parser en C con lxml; localiza la tabla por XPath y lee el texto de cada celda.
+    """
+    if not html or not html.strip():
+        return []
+    if not _cells_closed(html):
+        return _fallback(html, page_stats)
+    document = lxml.html.fromstring(html)
+    tables = document.xpath("//table[contains(concat(' ', normalize-space(@class), ' '), ' table ')]")
+    if not tables:
+        return []
+
+    rows = []
+    for tr in tables[0].iter('tr'):
+        cells = []
+        for i, td in enumerate(tr.iter('td')):
+            link = td.find('.//a') if i in LINK_COLUMNS else None
+            cells.append((link if link is not None else td).text_content())
+        rows.append(cells)
+    return rows[1:]
+
+
+GAME_LOG_PARSERS = {
+    "bs4": game_log_rows_bs4,
+    "strainer": game_log_rows_strainer,
+}
+if lxml is not None:
+    GAME_LOG_PARSERS["lxml"] = game_log_rows_lxml
+
+
+def get_game_log_parser(name=None):
+    """
+    Devuelve la función que extrae las filas (lista de textos por celda) de la tabla
+    de partidos de un jugador, según el backend configurado.
+    """
+    name = name or PARSER_BACKEND
+    if name == "auto":
+        name = "lxml" if "lxml" in GAME_LOG_PARSERS else "strainer"
+    if name not in GAME_LOG_PARSERS:
+        logging.warning(f"Parser '{name}' no disponible; se usa bs4.")
+        name = "bs4"
+    return GAME_LOG_PARSERS[name]
@@ -0,0 +1,40 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.scraper import scrape_team_stats
+
+# Número de equipos que se scrapean a la vez (configurable por variable de entorno)
+REFRESH_WORKERS = int(os.environ.get("REFRESH_WORKERS", "4"))
+
+
+def refresh_teams(team_names, max_workers=None, on_team_done=None):
+    """
+    Actualiza varios equipos en paralelo con concurrencia acotada.
+
+    Cada equipo se procesa de forma aislada: un error en uno no detiene al resto.
+    Si se indica `on_team_done`, se llama con (equipo, error o None) al terminar cada uno.
+    Devuelve un diccionario con los equipos actualizados y los errores por equipo.
+    """
+    max_workers = max_workers or REFRESH_WORKERS
+    updated = []
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="team-refresh") as executor:
+        futures = {executor.submit(scrape_team_stats, team_name, stale_ok=False): team_name for team_name in team_names}
+        for future in as_completed(futures):
+            team_name = futures[future]
+            try:
+                future.result()
+                updated.append(team_name)
+                logging.info(f"Equipo actualizado: {team_name}")
+            except Exception as e:
+                errors[team_name] = str(e)
+                logging.error(f"Error al actualizar el equipo {team_name}: {str(e)}")
+            if on_team_done is not None:
+                on_team_done(team_name, errors.get(team_name))
+
+    # Orden determinista, independiente del orden de finalización
+    order = {team_name: i for i, team_name in enumerate(team_names)}
+    updated.sort(key=order.get)
+    return {"updated": updated, "errors": errors}
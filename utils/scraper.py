@@ -1,14 +1,31 @@
 import os
-import json
 import logging
-import requests
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 import pandas as pd
 
+from utils.http_client import PLAYER_WORKERS
+from utils.http_cache import fetch_parsed
+from utils.dates import parse_date
+from utils.parsers import get_game_log_parser
+from utils.instrumentation import PageStats
+from utils.doc_cache import DocumentCache
+from utils import storage_sqlite
+from utils.columnar import GameColumns, mean_by_stat, distribution_stats
+from utils.single_flight import SingleFlight
+from utils.storage_json import load_json_file, write_json_file
+from utils.form import update_player_form
+
 BASE_URL = "https://www.proballers.com"  # Cambia a la URL base de tu web scraping
 DATA_DIR = "data"  # Carpeta donde se almacenan los JSON
 
+# Ingesta incremental: solo se procesan los partidos posteriores al último conocido de cada jugador
+INCREMENTAL_INGEST = os.environ.get("INCREMENTAL_INGEST", "1") != "0"
+
+# Stale-while-revalidate: si el JSON de un equipo está desactualizado se sirve igualmente
+# y el scraping se lanza en segundo plano
+STALE_WHILE_REVALIDATE = os.environ.get("STALE_WHILE_REVALIDATE", "0") == "1"
+
 equipos = {
     "Atlanta Hawks": "100/atlanta-hawks",
     "Boston Celtics": "101/boston-celtics",
@@ -42,10 +59,28 @@ equipos = {
     "Washington Wizards": "128/washington-wizards"
 }
 
+# Caché en memoria de los documentos de equipo ya parseados
+document_cache = DocumentCache()
+
+_player_executor = ThreadPoolExecutor(max_workers=PLAYER_WORKERS, thread_name_prefix="player-scraper")
+
+# Un solo scraping en curso por equipo; las peticiones concurrentes esperan su resultado
+team_scrapes = SingleFlight()
+_revalidate_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="team-revalidate")
+
 def get_player_data(team_name, player_name):
     """
     Devuelve las estadísticas del jugador almacenadas en el JSON de un equipo.
     """
+    if storage_sqlite.enabled():
+        # Consulta indexada por jugador en la base de datos
+        player_stats = storage_sqlite.get_player_games(team_name, player_name)
+        if not player_stats:
+            if storage_sqlite.get_player_names(team_name) is None:
+                raise FileNotFoundError(f"El equipo {team_name} no está en la base de datos.")
+            raise ValueError(f"El jugador {player_name} no se encuentra en el equipo {team_name}.")
+        return player_stats
+
     # Ruta al archivo JSON del equipo
     file_path = os.path.join(DATA_DIR, f"{team_name}.json")
 
@@ -53,10 +88,8 @@ def get_player_data(team_name, player_name):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"El archivo JSON para el equipo {team_name} no existe.")
 
-    # Lee los datos del JSON
-    with open(file_path, "r") as file:
-        logging.info(f"Leyendo el archivo JSON del equipo: {file_path}")
-        team_data = json.load(file)
+    # Lee los datos del JSON (desde la caché de documentos si no ha cambiado)
+    team_data = read_json_cached(file_path)
 
     # Verifica si el jugador está en los datos
     player_stats = team_data.get("players", {}).get(player_name)
@@ -65,61 +98,114 @@ def get_player_data(team_name, player_name):
 
     return player_stats
 
-def get_player_stats(player_url, team_role):
+def get_player_form(team_name, player_name):
+    """
+    Devuelve el estado de forma guardado de un jugador. Si el documento es anterior a
+    las métricas de forma, se calcula a partir de sus partidos.
+    """
+    state = None
+    if storage_sqlite.enabled():
+        state = storage_sqlite.get_player_form(team_name, player_name)
+    else:
+        file_path = os.path.join(DATA_DIR, f"{team_name}.json")
+        if os.path.exists(file_path):
+            state = read_json_cached(file_path).get("form", {}).get(player_name)
+    if state is not None:
+        return state
+    return update_player_form(None, get_player_data(team_name, player_name))
+
+# Identificadores de los parsers; cambiarlos invalida los resultados guardados en la caché HTTP
+PLAYER_PARSER_KEY = "player-stats-v1"
+TEAM_PARSER_KEY = "team-players-v1"
+
+def _player_parser_key(since):
+    """Clave del parser de jugador; incluye la fecha de corte del parseo parcial."""
+    return f"{PLAYER_PARSER_KEY}@{since.toordinal() if since else 0}"
+
+def get_player_stats(player_url, team_role, since=None):
     """
     Scrapea las estadísticas individuales de un jugador.
+    Si se indica `since` (datetime.date) solo se devuelven los partidos posteriores.
     """
-    response = requests.get(player_url)
-    if response.status_code != 200:
-        logging.error(f"error del servidor: {response}")
+    cutoff = since.toordinal() if since else 0
+
+    def reusable(stored_key):
+        # Un parseo guardado sirve si su fecha de corte no es posterior a la pedida
+        prefix, _, stored_cutoff = (stored_key or "").partition("@")
+        return prefix == PLAYER_PARSER_KEY and stored_cutoff.isdigit() and int(stored_cutoff) <= cutoff
+
+    page_stats = PageStats(player_url)
+    status_code, player_stats = fetch_parsed(
+        player_url,
+        lambda html: parse_player_stats(html, since, page_stats=page_stats),
+        _player_parser_key(since),
+        reusable,
+        page_stats,
+    )
+    page_stats.emit()
+    if status_code != 200:
+        logging.error("error del servidor: %s en %s", status_code, player_url)
         return []
+    return player_stats
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    stats_table = soup.find('table', class_='table')
-    logging.info(f"tabla de stats obtenida: {stats_table}")
-    if not stats_table:
-        return []
+def parse_player_stats(html, since=None, parser=None, page_stats=None):
+    """
+    Extrae las filas de partidos de la página de un jugador.
+    Las filas con fecha igual o anterior a `since` se descartan sin procesar el resto de columnas.
+    `parser` permite elegir el backend de parseo (ver utils.parsers).
+    """
+    rows = get_game_log_parser(parser)(html, page_stats)
+    return build_player_stats(rows, since, page_stats)
 
-    rows = stats_table.find_all('tr')[1:]
-    logging.info(f"filas de las tablas: {rows}")
+def build_player_stats(rows, since=None, page_stats=None):
+    """
+    Convierte las filas de la tabla de partidos (textos por celda) en estadísticas.
+    Es común a todos los backends de parseo, de modo que todos producen el mismo resultado.
+    Las filas descartadas se cuentan por motivo en `page_stats`.
+    """
+    page_stats = page_stats or PageStats(None)
     player_stats = []
-    for row in rows:
-        cols = row.find_all('td')
-        logging.info(f"columnas del jugador: {cols}")
+    for cols in rows:
+        page_stats.rows_seen += 1
         if len(cols) < 19:
-            logging.error(f"Menos de 19 columnas, fila ignorada.")
+            page_stats.skip("short_row")
             continue
 
         try:
+            # Columna 2 contiene la fecha
+            date = cols[1].strip()
+            if since:
+                game_date = parse_date(date)
+                if game_date and game_date <= since:
+                    page_stats.skip("already_known")
+                    continue
+
             # Extraer detalles del partido
-            opponent_info = cols[0].find('a').text.strip() if cols[0].find('a') else cols[0].text.strip()
+            opponent_info = cols[0].strip()
             is_home = "vs" in opponent_info
             opponent = opponent_info.replace("vs", "").replace("@", "").strip()
 
             # Validar si el oponente está en la lista de equipos válidos
             if opponent not in equipos:
-                logging.warning(f"Oponente '{opponent}' no es un equipo válido. Fila ignorada.")
+                page_stats.skip("invalid_opponent")
                 continue
 
-            # Columna 2 contiene la fecha
-            date = cols[1].find('a').text.strip() if cols[1].find('a') else cols[1].text.strip()
-
             # Extraer estadísticas individuales del jugador
             stats = {
                 "date": date,
                 "opponent": opponent,
                 "home_or_away": "home" if is_home else "away",
-                "PTS": float(cols[3].text.strip()) if cols[3].text.strip().isdigit() else 0,
-                "REB": float(cols[4].text.strip()) if cols[4].text.strip().isdigit() else 0,
-                "AST": float(cols[5].text.strip()) if cols[5].text.strip().isdigit() else 0,
-                "MIN": float(cols[6].text.strip()) if cols[6].text.strip().isdigit() else 0,
-                "2M": float(cols[7].text.split('-')[0]) if "-" in cols[7].text else 0,
-                "2A": float(cols[7].text.split('-')[1]) if "-" in cols[7].text else 0,
-                "3M": float(cols[8].text.split('-')[0]) if "-" in cols[8].text else 0,
-                "3A": float(cols[8].text.split('-')[1]) if "-" in cols[8].text else 0,
-                "STL": float(cols[16].text.strip()) if cols[16].text.strip().isdigit() else 0,
-                "BLK": float(cols[18].text.strip()) if cols[18].text.strip().isdigit() else 0,
-                "TO": float(cols[17].text.strip()) if cols[17].text.strip().isdigit() else 0,
+                "PTS": _count_cell(cols[3]),
+                "REB": _count_cell(cols[4]),
+                "AST": _count_cell(cols[5]),
+                "MIN": _count_cell(cols[6]),
+                "2M": float(cols[7].split('-')[0]) if "-" in cols[7] else 0,
+                "2A": float(cols[7].split('-')[1]) if "-" in cols[7] else 0,
+                "3M": float(cols[8].split('-')[0]) if "-" in cols[8] else 0,
+                "3A": float(cols[8].split('-')[1]) if "-" in cols[8] else 0,
+                "STL": _count_cell(cols[16]),
+                "BLK": _count_cell(cols[18]),
+                "TO": _count_cell(cols[17]),
             }
 
             # Añadir combinaciones de estadísticas
@@ -130,40 +216,66 @@ def get_player_stats(player_url, team_role):
 
             player_stats.append(stats)
         except (ValueError, IndexError) as e:
-            logging.error(f"Error procesando fila: {e}")
+            page_stats.skip("parse_error")
+            logging.debug("Error procesando fila: %s", e)
             continue
 
+    page_stats.rows_kept = len(player_stats)
+
     return player_stats
 
+def _count_cell(text):
+    """Valor numérico de una celda entera; 0 si está vacía o no es un número."""
+    text = text.strip()
+    return float(text) if text.isdigit() else 0
+
+# Estadísticas que se promedian en global_stats
+GLOBAL_STAT_KEYS = [
+    "PTS", "REB", "AST", "STL", "BLK", "TO", "2M", "2A", "3M", "3A",
+    "PTS+AST", "REB+AST", "PTS+REB", "PTS+REB+AST",
+]
+
+def _team_columns(player_stats):
+    """Matriz de partidos del equipo (una fila por partido) construida en una sola pasada."""
+    return GameColumns.from_player_stats(player_stats)
+
 def calculate_global_stats(player_stats):
     """
     Calcula estadísticas globales para un equipo a partir de las estadísticas individuales de los jugadores.
+    Sobre una única matriz numérica del equipo se obtienen las medias y, en la misma pasada,
+    la distribución de cada estadística y los desgloses por jugador y por local/visitante.
+    La matriz es la única fuente de las medias: cada clave plana coincide con
+    distribution[clave]["mean"].
     """
-    all_stats = {
-        "PTS": [],
-        "REB": [],
-        "AST": [],
-        "STL": [],
-        "BLK": [],
-        "TO": [],
-        "2M": [],
-        "2A": [],
-        "3M": [],
-        "3A": [],
-        "PTS+AST": [],
-        "REB+AST": [],
-        "PTS+REB": [],
-        "PTS+REB+AST": [],
-    }
+    columns = _team_columns(player_stats)
+    global_stats = mean_by_stat(columns, slice(None), GLOBAL_STAT_KEYS)
+    global_stats.update(distribution_stats(columns, GLOBAL_STAT_KEYS))
+    return global_stats
 
-    for player_name, stats in player_stats.items():
-        for stat_entry in stats:
-            for key in all_stats.keys():
-                if key in stat_entry:
-                    all_stats[key].append(stat_entry[key])
+def latest_game_date(games):
+    """
+    Fecha (datetime.date) del último partido guardado de un jugador, o None. Es la fecha
+    de corte de la ingesta incremental: solo se procesan los partidos posteriores.
+    """
+    dates = [game_date for game_date in map(parse_date, (game.get("date") for game in games)) if game_date]
+    return max(dates, default=None)
 
-    global_stats = {key: round(np.mean(values), 2) for key, values in all_stats.items() if values}
-    return global_stats
+def merge_player_games(existing_games, new_games):
+    """
+    Añade a la lista de partidos de un jugador los que aún no estaban (por fecha),
+    respetando el orden de la página (más reciente primero o último).
+    Devuelve (partidos combinados, partidos añadidos).
+    """
+    known_dates = {game["date"] for game in existing_games}
+    fresh = [game for game in new_games if game["date"] not in known_dates]
+    if not fresh:
+        return existing_games, []
+
+    first = parse_date(existing_games[0]["date"]) if existing_games else None
+    last = parse_date(existing_games[-1]["date"]) if existing_games else None
+    if first and last and first < last:
+        return existing_games + fresh, fresh
+    return fresh + existing_games, fresh
 
 def get_team_url(team_name):
     """
@@ -176,6 +288,20 @@ def get_team_url(team_name):
         raise ValueError(f"No se encontró la ruta para el equipo: {team_name}")
     return f"{BASE_URL}/es/baloncesto/equipo/{team_path}"
 
+def parse_team_players(html):
+    """
+    Extrae los jugadores de la página de un equipo y las URLs de sus partidos.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    players = {}
+    player_entries = soup.find_all('a', class_='list-player-entry stats-player')
+    for entry in player_entries:
+        href = entry.get('href')
+        title = entry.get('title')
+        if href and title:
+            players[title] = f"{BASE_URL}{href}/partidos"
+    return players
+
 def needs_update(team_name):
     """Verifica si un equipo necesita actualización."""
     file_path = os.path.join(DATA_DIR, f"{team_name}.json")
@@ -185,8 +311,11 @@ def needs_update(team_name):
         logging.info(f"Archivo no encontrado para {team_name}, necesita actualización.")
         return True
 
-    data = read_json(file_path)
-    last_updated = data.get("global_stats", {}).get("last_updated")
+    if storage_sqlite.enabled():
+        last_updated = storage_sqlite.get_last_updated(team_name)
+    else:
+        data = read_json_cached(file_path)
+        last_updated = data.get("global_stats", {}).get("last_updated")
 
     # Si no hay fecha de actualización o la fecha es anterior a hoy, necesita actualización
     if not last_updated:
@@ -198,149 +327,140 @@ def needs_update(team_name):
 
 
 def read_json(file_path):
-    """Lee un archivo JSON."""
+    """Lee un archivo JSON (plano o comprimido)."""
     if os.path.exists(file_path):
-        with open(file_path, 'r') as file:
-            logging.info(f"Leyendo json: {file_path}")
-            return json.load(file)
+        logging.info(f"Leyendo json: {file_path}")
+        return load_json_file(file_path)
     return {}
 
+def read_json_cached(file_path):
+    """
+    Lee un archivo JSON a través de la caché de documentos en memoria.
+    El documento devuelto es compartido: no debe modificarse.
+    """
+    try:
+        return document_cache.get(file_path)
+    except FileNotFoundError:
+        return {}
+
 def write_json(data, file_path):
-    """Escribe un archivo JSON."""
-    with open(file_path, 'w') as file:
-        logging.info(f"Escribiendo json: {file_path}")
-        json.dump(data, file, indent=4)
+    """Escribe un archivo JSON de forma atómica (temporal + fsync + rename)."""
+    logging.info(f"Escribiendo json: {file_path}")
+    write_json_file(data, file_path)
+    document_cache.invalidate(file_path)
+
+# Claves internas del documento de equipo que no se sirven en /api/team ("aggregates"
+# solo existe en documentos antiguos)
+INTERNAL_TEAM_KEYS = ("form", "aggregates")
+
+def public_team_data(team_data):
+    """Documento del equipo sin el estado interno (forma, acumulados antiguos)."""
+    return {key: value for key, value in team_data.items() if key not in INTERNAL_TEAM_KEYS}
+
+def _stored_team(team_name, file_path):
+    """Documento guardado de un equipo (SQLite o JSON)."""
+    if storage_sqlite.enabled():
+        return storage_sqlite.load_team_cached(team_name) or read_json_cached(file_path)
+    return read_json_cached(file_path)
+
+
+def _log_revalidate_error(team_name, future):
+    error = future.exception()
+    if error is not None:
+        logging.error(f"Error al actualizar en segundo plano el equipo {team_name}: {error}")
 
-def scrape_team_stats(team_name):
+
+def scrape_team_stats(team_name, stale_ok=None):
     """
     Scrapea estadísticas de un equipo y actualiza el JSON si es necesario.
+
+    Las peticiones simultáneas para un mismo equipo comparten un único scraping.
+    Con `stale_ok` (por defecto STALE_WHILE_REVALIDATE) se devuelve el JSON anterior
+    de inmediato y el scraping continúa en segundo plano.
     """
     # Verificar si el equipo necesita actualización
     file_path = os.path.join(DATA_DIR, f"{team_name}.json")
 
     if not needs_update(team_name) and os.path.exists(file_path):
         logging.info(f"No se requiere actualización para el equipo: {team_name}")
-        return read_json(file_path)
+        return _stored_team(team_name, file_path)
+
+    stale_ok = STALE_WHILE_REVALIDATE if stale_ok is None else stale_ok
+    if stale_ok and os.path.exists(file_path):
+        future = team_scrapes.do_background(team_name, _revalidate_executor, _scrape_team, team_name)
+        future.add_done_callback(lambda f: _log_revalidate_error(team_name, f))
+        logging.info(f"Sirviendo datos anteriores de {team_name} mientras se actualizan")
+        return _stored_team(team_name, file_path)
+
+    return team_scrapes.do(team_name, _scrape_team, team_name)
+
+
+def _scrape_team(team_name):
+    """
+    Scraping completo de un equipo; se ejecuta como máximo una vez a la vez por equipo.
+    """
+    file_path = os.path.join(DATA_DIR, f"{team_name}.json")
+
+    # Otro scraping puede haber terminado justo antes de tomar el turno
+    if not needs_update(team_name) and os.path.exists(file_path):
+        return _stored_team(team_name, file_path)
 
     # Obtener la URL del equipo
     team_url = get_team_url(team_name)
-    response = requests.get(team_url)
+    page_stats = PageStats(team_url)
+    status_code, players = fetch_parsed(team_url, parse_team_players, TEAM_PARSER_KEY, page_stats=page_stats)
+    page_stats.rows_seen = page_stats.rows_kept = len(players or {})
+    page_stats.emit()
     logging.info(f"Scraping del equipo: {team_name} con {team_url}")
 
-    if response.status_code != 200:
+    if status_code != 200:
         raise ValueError(f"No se pudo acceder a {team_url}")
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+    logging.info("Jugadores extraídos para %s: %d", team_name, len(players))
 
-    # Función para extraer jugadores y sus URLs
-    def extract_players(soup):
-        players = {}
-        player_entries = soup.find_all('a', class_='list-player-entry stats-player')
-        for entry in player_entries:
-            href = entry.get('href')
-            title = entry.get('title')
-            if href and title:
-                players[title] = f"{BASE_URL}{href}/partidos"
-        return players
+    # Datos previos para la ingesta incremental
+    previous = read_json_cached(file_path) if INCREMENTAL_INGEST else {}
+    previous_players = previous.get("players", {})
+    previous_form = previous.get("form", {})
 
-    # Extraer jugadores
-    players = extract_players(soup)
-    logging.info(f"Jugadores extraídos: {players}")
+    # Obtener estadísticas de los jugadores en paralelo (conservando el orden de la plantilla)
+    futures = {}
+    for player_name, player_url in players.items():
+        since = latest_game_date(previous_players[player_name]) if player_name in previous_players else None
+        futures[player_name] = _player_executor.submit(get_player_stats, player_url, team_name, since)
 
-    # Obtener estadísticas de los jugadores
     player_stats = {}
-    for player_name, player_url in players.items():
-        stats = get_player_stats(player_url, team_name)
-        logging.info(f"Estadísticas del jugador {player_name} extraídas: {stats}")
-        player_stats[player_name] = stats
-        
+    form = {}
+    for player_name, future in futures.items():
+        stats = future.result()
+        logging.debug("Partidos nuevos de %s: %d", player_name, len(stats))
+        games, fresh = merge_player_games(previous_players.get(player_name, []), stats)
+        # Métricas de forma: solo se aplican los partidos nuevos si ya había estado previo
+        if player_name in previous_form and player_name in previous_players:
+            form[player_name] = update_player_form(previous_form[player_name], fresh)
+        else:
+            form[player_name] = update_player_form(None, games)
+        player_stats[player_name] = games
+
     global_stats = calculate_global_stats(player_stats)
     global_stats["last_updated"] = pd.Timestamp.today().strftime("%Y-%m-%d")
 
     # Calcular estadísticas globales
-    logging.info(f"Estadísticas globales calculadas: {global_stats}")
+    logging.debug("Estadísticas globales calculadas para %s: %s", team_name, global_stats)
 
     # Crear el objeto de datos final
     team_data = {
         "team_name": team_name,
         "players": player_stats,
         "global_stats": global_stats,
+        "form": form,
     }
 
     # Guardar en el JSON
     write_json(team_data, file_path)
+    if storage_sqlite.enabled():
+        storage_sqlite.save_team(team_data)
     logging.info(f"Datos del equipo {team_name} guardados en {file_path}")
 
     return team_data
 
-
-OUTPUT_FILE = os.path.join(DATA_DIR, "opponent_stats.json")
-
-def calculate_opponent_stats():
-    """
-    Genera estadísticas de rendimiento de los jugadores que han jugado contra cada equipo,
-    incluyendo solo las líneas de los jugadores correspondientes al equipo oponente.
-    """
-    opponent_stats = {}
-
-    # Recorrer los archivos de los equipos
-    for team_file in os.listdir(DATA_DIR):
-        if not team_file.endswith(".json"):
-            continue
-
-        team_path = os.path.join(DATA_DIR, team_file)
-
-        try:
-            with open(team_path, "r") as file:
-                team_data = json.load(file)
-        except json.JSONDecodeError as e:
-            print(f"Error al cargar {team_file}: {e}")
-            continue
-
-        current_team_name = team_data.get("team_name")
-        if not current_team_name:
-            print(f"Archivo {team_file} no contiene 'team_name'.")
-            continue
-
-        # Recorrer los jugadores y sus juegos
-        players = team_data.get("players", {})
-        if not isinstance(players, dict):
-            print(f"'players' no es un diccionario en {team_file}.")
-            continue
-
-        for player_name, games in players.items():
-            if not isinstance(games, list):
-                print(f"'games' no es una lista para {player_name} en {team_file}.")
-                continue
-
-            for game in games:
-                opponent = game.get("opponent")
-                if not opponent:
-                    print(f"Juego inválido encontrado en {team_file}: {game}")
-                    continue
-
-                # Asegurar que el oponente esté inicializado
-                if opponent not in opponent_stats:
-                    opponent_stats[opponent] = []
-
-                # Crear una línea de rendimiento
-                line = game.copy()
-                line["player"] = player_name
-                line["team"] = current_team_name
-
-                # Añadir la línea al equipo oponente
-                opponent_stats[opponent].append(line)
-
-    # Guardar el archivo JSON
-    try:
-        with open(OUTPUT_FILE, "w") as output_file:
-            json.dump(opponent_stats, output_file, indent=4)
-            print(f"Archivo guardado en {OUTPUT_FILE}")
-    except Exception as e:
-        print(f"Error al guardar el archivo {OUTPUT_FILE}: {e}")
-
-
-
-
-
-
@@ -0,0 +1,47 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas por clave: mientras una llamada para una clave está en
+    curso, las demás peticiones con la misma clave esperan su resultado (o su
+    excepción) en lugar de repetir el trabajo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _claim(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _run(self, key, future, func, args):
+        try:
+            result = func(*args)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def do(self, key, func, *args):
+        """Ejecuta func(*args) en este hilo, o espera a la llamada ya en curso para `key`."""
+        future, leader = self._claim(key)
+        if leader:
+            self._run(key, future, func, args)
+        return future.result()
+
+    def do_background(self, key, executor, func, *args):
+        """Como do(), pero la llamada se lanza en `executor` y se devuelve el Future sin esperar."""
+        future, leader = self._claim(key)
+        if leader:
+            executor.submit(self._run, key, future, func, args)
+        return future
@@ -0,0 +1,114 @@
+import io
+import os
+import gzip
+import json
+import logging
+import threading
+from contextlib import contextmanager
+
+from utils.json_provider import json_backend
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional; sin él la compresión zstd usa gzip
+    zstandard = None
+
+# Separadores compactos en los JSON de datos (JSON_COMPACT=0 vuelve a indent=4)
+JSON_COMPACT = os.environ.get("JSON_COMPACT", "1") != "0"
+
+# Compresión de los JSON de datos: "none", "gzip" o "zstd". La lectura detecta el
+# formato por su cabecera, así que los archivos conservan la extensión .json
+JSON_COMPRESSION = os.environ.get("JSON_COMPRESSION", "none")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def dump_kwargs(compact=None):
+    """Argumentos de json.dump según el formato configurado."""
+    compact = JSON_COMPACT if compact is None else compact
+    return {"separators": (",", ":")} if compact else {"indent": 4}
+
+
+def _compression(name):
+    name = name or JSON_COMPRESSION
+    if name == "zstd" and zstandard is None:
+        logging.warning("zstandard no está instalado; se usa gzip.")
+        return "gzip"
+    if name not in ("none", "gzip", "zstd"):
+        logging.warning(f"Compresión '{name}' no soportada; se escribe sin comprimir.")
+        return "none"
+    return name
+
+
+@contextmanager
+def atomic_binary_writer(path, compression=None):
+    """
+    Abre un archivo binario temporal junto a `path` (comprimido si se indica); al salir
+    sin errores hace fsync y lo renombra sobre `path`, de modo que los lectores ven el
+    archivo anterior o el nuevo completo, nunca uno a medio escribir.
+    """
+    compression = _compression(compression)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        with open(tmp_path, "wb") as raw:
+            if compression == "gzip":
+                stream = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)
+            elif compression == "zstd":
+                stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+            else:
+                stream = raw
+            yield stream
+            if stream is not raw:
+                stream.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_text_writer(path, compression=None):
+    """Versión de texto (UTF-8) de atomic_binary_writer."""
+    with atomic_binary_writer(path, compression) as stream:
+        text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        yield text
+        text.flush()
+        text.detach()
+
+
+def write_json_file(data, path, compact=None, compression=None, ensure_ascii=True):
+    """
+    Escribe `data` como JSON de forma atómica. En formato compacto se serializa con el
+    backend JSON configurado (orjson si está instalado).
+    """
+    compact = JSON_COMPACT if compact is None else compact
+    if compact:
+        with atomic_binary_writer(path, compression) as stream:
+            stream.write(json_backend.dumps_bytes(data, ensure_ascii=ensure_ascii))
+        return
+    with atomic_text_writer(path, compression) as file:
+        json.dump(data, file, ensure_ascii=ensure_ascii, **dump_kwargs(compact))
+
+
+def read_bytes(path):
+    """Contenido de un archivo de datos, descomprimido si está en gzip o zstd."""
+    with open(path, "rb") as file:
+        data = file.read()
+    if data.startswith(_GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError(f"{path} está comprimido con zstd y zstandard no está instalado")
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    return data
+
+
+def load_json_file(path):
+    """Lee un JSON de datos (plano, gzip o zstd)."""
+    return json_backend.loads(read_bytes(path))
@@ -0,0 +1,303 @@
+"""
+Almacenamiento opcional en SQLite para equipos, jugadores y partidos.
+
+Se activa con STORAGE_BACKEND=sqlite. El scraper sigue escribiendo los JSON de cada
+equipo y además guarda los datos aquí; los endpoints leen de la base de datos con
+consultas indexadas en lugar de parsear archivos completos. Lo reconstruido desde la
+base de datos se reutiliza mientras sus archivos no cambien (cached()), igual que los
+JSON en la caché de documentos.
+
+Importación inicial de los JSON existentes:
+    python -m utils.storage_sqlite [carpeta_de_datos]
+"""
+import os
+import sys
+import json
+import sqlite3
+import logging
+import threading
+
+from utils.dates import date_id
+from utils.storage_json import load_json_file
+from utils.game_query import QueryIndexCache
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join("data", "stats.db"))
+
+# Estadísticas de cada partido -> columna de la tabla games (en el orden del JSON)
+STAT_COLUMNS = {
+    "PTS": "pts",
+    "REB": "reb",
+    "AST": "ast",
+    "MIN": "min",
+    "2M": "fg2m",
+    "2A": "fg2a",
+    "3M": "fg3m",
+    "3A": "fg3a",
+    "STL": "stl",
+    "BLK": "blk",
+    "TO": "tov",
+    "PTS+AST": "pts_ast",
+    "REB+AST": "reb_ast",
+    "PTS+REB": "pts_reb",
+    "PTS+REB+AST": "pts_reb_ast",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS teams (
+    name TEXT PRIMARY KEY,
+    last_updated TEXT,
+    global_stats TEXT NOT NULL,
+    form TEXT
+);
+CREATE TABLE IF NOT EXISTS players (
+    team TEXT NOT NULL REFERENCES teams(name) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (team, name)
+);
+CREATE TABLE IF NOT EXISTS games (
+    team TEXT NOT NULL,
+    player TEXT NOT NULL,
+    date TEXT NOT NULL,
+    date_id INTEGER,
+    opponent TEXT NOT NULL,
+    home_or_away TEXT,
+    position INTEGER NOT NULL,
+    {", ".join(f"{column} REAL" for column in STAT_COLUMNS.values())},
+    PRIMARY KEY (team, player, date)
+);
+CREATE INDEX IF NOT EXISTS idx_games_player_date ON games (player, date_id);
+CREATE INDEX IF NOT EXISTS idx_games_opponent_date ON games (opponent, date_id);
+"""
+
+GAME_COLUMNS = ["date", "opponent", "home_or_away"] + list(STAT_COLUMNS.values())
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_paths = set()
+
+# Documentos y respuestas reconstruidos desde la base de datos, por versión de sus archivos
+_read_cache = QueryIndexCache()
+
+
+def enabled():
+    """Indica si el almacenamiento SQLite está activado."""
+    return STORAGE_BACKEND == "sqlite"
+
+
+def connect(path=None):
+    """Devuelve la conexión del hilo actual, creando el esquema la primera vez."""
+    path = path or SQLITE_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = sqlite3.connect(path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        with _init_lock:
+            if path not in _initialized_paths:
+                connection.executescript(SCHEMA)
+                _migrate(connection)
+                _initialized_paths.add(path)
+        connections[path] = connection
+    return connection
+
+
+def database_version(path=None):
+    """Versión de la base de datos: (mtime en ns, tamaño) de la base y de su WAL."""
+    path = path or SQLITE_PATH
+    version = []
+    for file_path in (path, f"{path}-wal"):
+        try:
+            stat = os.stat(file_path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+def cached(key, build, path=None):
+    """
+    Resultado de build() reutilizado mientras la base de datos no cambie. El valor es
+    compartido entre peticiones: no debe modificarse.
+    """
+    path = path or SQLITE_PATH
+    return _read_cache.get((path, key), database_version(path), lambda version: build())
+
+
+def _migrate(connection):
+    """Añade las columnas nuevas a bases de datos creadas con un esquema anterior."""
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(teams)")}
+    if "form" not in columns:
+        with connection:
+            connection.execute("ALTER TABLE teams ADD COLUMN form TEXT")
+
+
+def _game_from_row(row):
+    game = {"date": row["date"], "opponent": row["opponent"], "home_or_away": row["home_or_away"]}
+    for key, column in STAT_COLUMNS.items():
+        if row[column] is not None:
+            game[key] = row[column]
+    return game
+
+
+def save_team(team_data, path=None):
+    """Guarda (reemplazando) el documento completo de un equipo en una transacción."""
+    connection = connect(path)
+    team_name = team_data["team_name"]
+    global_stats = team_data.get("global_stats", {})
+    placeholders = ", ".join("?" for _ in range(len(GAME_COLUMNS) + 4))
+
+    game_rows = []
+    player_rows = []
+    for player_position, (player_name, games) in enumerate(team_data.get("players", {}).items()):
+        player_rows.append((team_name, player_name, player_position))
+        for position, game in enumerate(games):
+            game_rows.append((
+                team_name, player_name, date_id(game["date"]), position,
+                game["date"], game["opponent"], game.get("home_or_away"),
+                *(game.get(key) for key in STAT_COLUMNS),
+            ))
+
+    with connection:
+        connection.execute("DELETE FROM games WHERE team = ?", (team_name,))
+        connection.execute("DELETE FROM players WHERE team = ?", (team_name,))
+        connection.execute(
+            "INSERT OR REPLACE INTO teams (name, last_updated, global_stats, form) VALUES (?, ?, ?, ?)",
+            (
+                team_name,
+                global_stats.get("last_updated"),
+                json.dumps(global_stats),
+                json.dumps(team_data["form"]) if "form" in team_data else None,
+            ),
+        )
+        connection.executemany("INSERT INTO players (team, name, position) VALUES (?, ?, ?)", player_rows)
+        connection.executemany(
+            f"INSERT OR REPLACE INTO games (team, player, date_id, position, {', '.join(GAME_COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            game_rows,
+        )
+
+
+def get_last_updated(team_name, path=None):
+    """Fecha de la última actualización del equipo, o None si no está en la base de datos."""
+    row = connect(path).execute("SELECT last_updated FROM teams WHERE name = ?", (team_name,)).fetchone()
+    return row["last_updated"] if row else None
+
+
+def get_player_names(team_name, path=None):
+    """Nombres de los jugadores del equipo en el orden de la plantilla, o None si no existe."""
+    connection = connect(path)
+    if connection.execute("SELECT 1 FROM teams WHERE name = ?", (team_name,)).fetchone() is None:
+        return None
+    rows = connection.execute("SELECT name FROM players WHERE team = ? ORDER BY position", (team_name,))
+    return [row["name"] for row in rows]
+
+
+def get_player_games(team_name, player_name, path=None):
+    """Partidos de un jugador del equipo, en el orden original."""
+    rows = connect(path).execute(
+        f"SELECT {', '.join(GAME_COLUMNS)} FROM games WHERE team = ? AND player = ? ORDER BY position",
+        (team_name, player_name),
+    )
+    return [_game_from_row(row) for row in rows]
+
+
+def load_team(team_name, path=None):
+    """Reconstruye el documento del equipo con la misma forma que el JSON, o None si no existe."""
+    connection = connect(path)
+    team_row = connection.execute(
+        "SELECT global_stats, form FROM teams WHERE name = ?", (team_name,)
+    ).fetchone()
+    if team_row is None:
+        return None
+
+    players = {name: [] for name in get_player_names(team_name, path)}
+    rows = connection.execute(
+        f"SELECT player, {', '.join(GAME_COLUMNS)} FROM games WHERE team = ? ORDER BY player, position",
+        (team_name,),
+    )
+    for row in rows:
+        players.setdefault(row["player"], []).append(_game_from_row(row))
+
+    team_data = {
+        "team_name": team_name,
+        "players": players,
+        "global_stats": json.loads(team_row["global_stats"]),
+    }
+    if team_row["form"]:
+        team_data["form"] = json.loads(team_row["form"])
+    return team_data
+
+
+def get_player_form(team_name, player_name, path=None):
+    """Estado de forma guardado de un jugador, o None si no existe."""
+    row = connect(path).execute("SELECT form FROM teams WHERE name = ?", (team_name,)).fetchone()
+    if row is None or not row["form"]:
+        return None
+    return json.loads(row["form"]).get(player_name)
+
+
+def _opponent_line_rows(connection, where="", params=()):
+    return connection.execute(
+        f"SELECT g.team, g.player, {', '.join('g.' + column for column in GAME_COLUMNS)} "
+        "FROM games g JOIN players p ON p.team = g.team AND p.name = g.player "
+        f"{where} ORDER BY g.opponent, g.team, p.position, g.position",
+        params,
+    )
+
+
+def _line_from_row(row):
+    line = _game_from_row(row)
+    line["player"] = row["player"]
+    line["team"] = row["team"]
+    return line
+
+
+def get_opponent_lines(opponent, path=None):
+    """Líneas de los jugadores que se han enfrentado a `opponent` (consulta indexada)."""
+    rows = _opponent_line_rows(connect(path), "WHERE g.opponent = ?", (opponent,))
+    return [_line_from_row(row) for row in rows]
+
+
+def get_all_opponent_lines(path=None):
+    """Líneas de todos los oponentes, agrupadas por oponente (en una sola consulta)."""
+    by_opponent = {}
+    for row in _opponent_line_rows(connect(path)):
+        by_opponent.setdefault(row["opponent"], []).append(_line_from_row(row))
+    return by_opponent
+
+
+def load_team_cached(team_name, path=None):
+    """load_team() reutilizado mientras la base de datos no cambie (documento compartido)."""
+    return cached(("team", team_name), lambda: load_team(team_name, path), path)
+
+
+def import_json_dir(data_dir="data", path=None):
+    """Importa a SQLite todos los JSON de equipo de `data_dir`. Devuelve los equipos importados."""
+    imported = []
+    for file_name in sorted(os.listdir(data_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            team_data = load_json_file(os.path.join(data_dir, file_name))
+        except (OSError, ValueError) as e:
+            logging.error(f"Error al cargar {file_name}: {e}")
+            continue
+        if not isinstance(team_data, dict) or not team_data.get("team_name"):
+            continue
+        save_team(team_data, path)
+        imported.append(team_data["team_name"])
+    return imported
+
+
+if __name__ == "__main__":
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    teams = import_json_dir(data_dir)
+    print(f"Importados {len(teams)} equipos en {SQLITE_PATH}")